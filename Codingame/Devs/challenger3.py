@@ -21,8 +21,12 @@
 
 
 from typing import List, NamedTuple, Dict
-from queue import PriorityQueue
+import heapq, math, time
 import random
+import os
+
+# graine donnée par Tools/referee.py, pour que Tools/replay.py rejoue les mêmes tirages
+random.seed(os.environ.get("BOT_SEED"))
 
 MAX_SCAN_RADIUS = 2000
 SCAN_RADIUS = 800
@@ -72,60 +76,93 @@ def euclidean_distance_drone_fish(drone: Drone, fish: Fish) -> float:
     """Calcule la distance euclidienne entre un drone et un poisson."""
     return ((drone.pos.x - fish.pos.x) ** 2 + (drone.pos.y - fish.pos.y) ** 2) ** 0.5
 
-# Fonction A* pour trouver un chemin du drone vers un poisson cible
-def a_star(drone: Drone, target_fish: Fish, visible_fish: List[Fish], map_size: int) -> List[Vector]:
-    # Définir le point de départ et le point d'arrivée
-    start = drone.pos
-    goal = target_fish.pos
-
-    # Initialiser l'ensemble ouvert avec la position de départ du drone
-    open_set = PriorityQueue()
-    open_set.put((0, start))
-    
-    # Dictionnaire pour garder une trace de la provenance de chaque nœud
-    came_from = {start: None}
-    
-    # Dictionnaire pour garder une trace du coût jusqu'à présent pour atteindre chaque nœud
-    cost_so_far = {start: 0}
+# Planificateur dans la géométrie réelle du jeu : pas de 600 unités dans 16 directions (plus le cap direct
+# vers la cible), zones de danger circulaires autour des monstres visibles qui avancent à leur vitesse,
+# recherche A* avec heapq limitée en nombre de nœuds pour répondre en quelques millisecondes.
+DRONE_STEP = 600
+DANGER_RADIUS = 600  # rayon d'urgence (500) plus une marge
+DANGER_GROWTH = 150  # la position future d'un monstre est de moins en moins sûre
+NODE_CELL = 300  # deux nœuds dans la même case de 300x300 sont considérés identiques
+HEADINGS = [(math.cos(math.pi * k / 8), math.sin(math.pi * k / 8)) for k in range(16)]
+
+
+def clearance(start: Vector, end: Vector, step: int, monsters: List[Fish]) -> float:
+    """Plus petite marge (distance moins rayon de danger) entre le trajet start -> end du tour step et les monstres."""
+    mx, my = end.x - start.x, end.y - start.y
+    margin = float("inf")
+    for monster in monsters:
+        # monstre dans le repère du drone : position au début du tour et vitesse relative
+        px = monster.pos.x + monster.speed.x * step - start.x
+        py = monster.pos.y + monster.speed.y * step - start.y
+        vx, vy = monster.speed.x - mx, monster.speed.y - my
+        vv = vx * vx + vy * vy
+        t = 0.0 if vv == 0 else min(1.0, max(0.0, -(px * vx + py * vy) / vv))
+        cx, cy = px + vx * t, py + vy * t
+        margin = min(margin, math.sqrt(cx * cx + cy * cy) - DANGER_RADIUS - DANGER_GROWTH * step)
+    return margin
 
-    # Tant que l'ensemble ouvert n'est pas vide, continuer à explorer
-    while not open_set.empty():
-        _, current = open_set.get()
 
-        # Si le nœud actuel est le but, arrêter la recherche
-        if current == goal:
+# Fonction A* pour trouver un chemin du drone vers un poisson cible
+def a_star(drone: Drone, target_fish: Fish, visible_fish: List[Fish], map_size: int,
+           max_steps: int = 10, max_nodes: int = 300, budget: float = 0.005) -> List[Vector]:
+    """Liste des points de passage (un par tour) vers le poisson, en évitant les monstres visibles.
+
+    La recherche s'arrête sur la cible ou à l'horizon de max_steps tours ; si la limite de nœuds ou le
+    budget de temps (en secondes) sont atteints avant, le chemin mène au nœud sûr le plus proche de la cible.
+    Si aucun premier pas n'est sûr, on prend le pas qui s'éloigne le plus des monstres.
+    """
+    deadline = time.perf_counter() + budget
+    start, goal = drone.pos, target_fish.pos
+    monsters = [f for f in visible_fish if f.detail.type == -1]
+
+    def remaining(x: float, y: float) -> float:
+        # nombre de tours restants à vol d'oiseau : heuristique admissible et cohérente
+        return math.hypot(goal.x - x, goal.y - y) / DRONE_STEP
+
+    nodes = [(start.x, start.y, -1)]  # x, y, parent
+    # (priorité, -tour, nœud) : à priorité égale le nœud le plus avancé passe d'abord
+    open_set = [(remaining(start.x, start.y), 0, 0)]
+    seen = {(int(start.x) // NODE_CELL, int(start.y) // NODE_CELL)}
+    best = 0
+    while open_set and len(nodes) < max_nodes and time.perf_counter() < deadline:
+        _, step, n = heapq.heappop(open_set)
+        step = -step
+        x, y, _ = nodes[n]
+        if remaining(x, y) < remaining(*nodes[best][:2]):
+            best = n
+        if (x, y) == (goal.x, goal.y) or step >= max_steps:
+            # la cible, ou le premier nœud de l'horizon sorti de la file : le meilleur vu l'heuristique
+            best = n
             break
+        gx, gy = goal.x - x, goal.y - y
+        gd = math.hypot(gx, gy)
+        if gd <= DRONE_STEP:
+            moves = [(goal.x, goal.y)]
+        else:
+            moves = [(x + gx / gd * DRONE_STEP, y + gy / gd * DRONE_STEP)]
+            moves += [(x + hx * DRONE_STEP, y + hy * DRONE_STEP) for hx, hy in HEADINGS]
+        for nx, ny in moves:
+            nx, ny = min(max(nx, 0), map_size - 1), min(max(ny, 0), map_size - 1)
+            key = (int(nx) // NODE_CELL, int(ny) // NODE_CELL)
+            if key in seen and (nx, ny) != (goal.x, goal.y):
+                continue
+            if clearance(Vector(x, y), Vector(nx, ny), step, monsters) < 0:
+                continue
+            seen.add(key)
+            nodes.append((nx, ny, n))
+            heapq.heappush(open_set, (step + 1 + remaining(nx, ny), -step - 1, len(nodes) - 1))
 
-        # Explorer les voisins du nœud actuel
-        for next in get_neighbors(current, visible_fish, map_size):
-            new_cost = cost_so_far[current] + euclidean_distance_drone_fish(drone, Fish(0, next, Vector(0, 0), FishDetail(0, 0)))
-            if next not in cost_so_far or new_cost < cost_so_far[next]:
-                cost_so_far[next] = new_cost
-                priority = new_cost + euclidean_distance_drone_fish(drone, target_fish)
-                open_set.put((priority, next))
-                came_from[next] = current
-
-# Fonction pour obtenir les voisins d'un nœud donné
-def get_neighbors(node: Vector, visible_fish: List[Fish], map_size: int) -> List[Vector]:
-    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]  # Haut, Droite, Bas, Gauche
-    neighbors = []
-    for dx, dy in directions:
-        next_x, next_y = node.x + dx, node.y + dy
-        if 0 <= next_x < map_size and 0 <= next_y < map_size:
-            # Vérifier si le voisin est libre (pas occupé par un poisson visible)
-            if not any(fish.pos == Vector(next_x, next_y) for fish in visible_fish):
-                neighbors.append(Vector(next_x, next_y))
-    return neighbors
-
-def reconstruct_path(came_from: Dict[Vector, Vector], start: Vector, goal: Vector) -> List[Vector]:
-    """Reconstruit le chemin à partir du point de départ jusqu'à l'objectif."""
     path = []
-    current = goal
-    while current != start:
-        path.append(current)
-        current = came_from[current]
-    path.append(start)  # optionnel
-    path.reverse()  # optionnel
+    n = best
+    while n > 0:
+        x, y, n = nodes[n]
+        path.append(Vector(int(x), int(y)))
+    path.reverse()
+    if not path and (start.x, start.y) != (goal.x, goal.y):
+        # aucun pas sûr : celui qui laisse le plus de marge
+        steps = [Vector(int(min(max(start.x + hx * DRONE_STEP, 0), map_size - 1)),
+                        int(min(max(start.y + hy * DRONE_STEP, 0), map_size - 1))) for hx, hy in HEADINGS]
+        path = [max(steps, key=lambda end: clearance(start, end, 0, monsters))]
     return path
 
 # Ajoutez un ensemble pour suivre les poissons scannés
@@ -201,9 +238,10 @@ def random_movement_strategy(drone: Drone, visible_fish: List[Fish], map_width:
     target_x = random.randint(0, map_width)
     target_y = random.randint(0, map_height)
 
-    # Vérifier si un poisson est à proximité
+    # Vérifier si un poisson est à proximité (distances au carré, sans racine)
+    radius2 = detection_radius * detection_radius
     fish_nearby = any(
-        distance(drone.pos, fish.pos) <= detection_radius
+        (drone.pos.x - fish.pos.x) ** 2 + (drone.pos.y - fish.pos.y) ** 2 <= radius2
         for fish in visible_fish
     )
 
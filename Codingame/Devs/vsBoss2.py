@@ -18,6 +18,10 @@ En résumé, les poissons cibles sont sélectionnés en comparant leur potentiel
 
 from typing import List, NamedTuple, Dict
 import random
+import os
+
+# graine donnée par Tools/referee.py, pour que Tools/replay.py rejoue les mêmes tirages
+random.seed(os.environ.get("BOT_SEED"))
 
 MAX_SCAN_RADIUS = 2000
 SCAN_RADIUS = 800
@@ -123,9 +127,10 @@ def random_movement_strategy(drone: Drone, visible_fish: List[Fish], map_width:
     target_x = random.randint(0, map_width)
     target_y = random.randint(0, map_height)
 
-    # Vérifier si un poisson est à proximité
+    # Vérifier si un poisson est à proximité (distances au carré, sans racine)
+    radius2 = detection_radius * detection_radius
     fish_nearby = any(
-        distance(drone.pos, fish.pos) <= detection_radius
+        (drone.pos.x - fish.pos.x) ** 2 + (drone.pos.y - fish.pos.y) ** 2 <= radius2
         for fish in visible_fish
     )
 
@@ -16,8 +16,10 @@ La fonction retourne l'identifiant, la position et un indicateur de lumière pou
 En résumé, les poissons cibles sont sélectionnés en comparant leur potentiel de points, avec des préférences données aux poissons qui n'ont pas encore été scannés et qui offrent des bonus supplémentaires en termes de type ou de couleur.
 """
 
-import sys,math
-from typing import List, NamedTuple, Dict
+import sys,math,os,time,atexit,signal,struct,json,traceback
+import itertools
+import numpy as np
+from typing import List, NamedTuple, Dict, Tuple
 from dataclasses import dataclass
 
 # TODO better scoring
@@ -25,12 +27,136 @@ from dataclasses import dataclass
 # TODO find better path past monsters
 # TODO chaae fish off the ma
 
+# tunable constants: Tools/tune.py plays games with MYIA_PARAMS='{"name": value}' and prints this block
+# with the best values it found, ready to paste over this one
+PARAMS = {
+    "drone_speed": 600,      # length of a greedy move, deeper than 2500
+    "shallow_speed": 600,    # length of a greedy move in the top 2500
+    "battery_value": 0.05,   # points a unit of battery left is worth to the light scheduler
+    "scan_discount": 0.7,    # worth of a fish found a turn later, for the light scheduler
+    "wake_cost": 0.3,        # share of the scans carried put at stake by drawing a monster in with the light
+    "miss_distance": 1000,   # a tracked monster passing closer than this must be avoided
+    "monster_patrol": 270,   # monster speeds of the forecast
+    "monster_chase": 540,
+    "route_fish": 4,         # most fish scanned before surfacing
+}
+PARAMS.update(json.loads(os.environ.get("MYIA_PARAMS", "{}")))
+
 # Define the data structures as @dataclasses
 
 class game():
     def __init__(self,turn = 0):
         self.turn = turn
-        
+        self.turn_start = time.perf_counter()
+
+
+class PhaseTimer:
+    # per-phase turn timings, switched on with the MYIA_TIMING=1 environment variable
+    # when off, start_turn/lap/end_turn do nothing so production submissions pay nothing
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.phases: Dict[str, List[float]] = {}
+        self.totals: List[float] = []
+        self.worst_turn = 0
+        self.worst_phases: Dict[str, float] = {}
+        self.current: Dict[str, float] = {}
+        self.reported = False
+        self.turn_start = self.last = 0.0
+        if not enabled:
+            self.start_turn = self.lap = self.end_turn = self.report = lambda *args: None
+        else:
+            atexit.register(self.report)
+
+    def start_turn(self):
+        self.turn_start = self.last = time.perf_counter()
+        self.current = {}
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        elapsed = (now - self.last)*1000
+        self.current[phase] = self.current.get(phase, 0.0) + elapsed
+        self.phases.setdefault(phase, []).append(elapsed)
+        self.last = now
+
+    def end_turn(self, turn: int):
+        total = (time.perf_counter() - self.turn_start)*1000
+        self.totals.append(total)
+        if total >= max(self.totals):
+            self.worst_turn = turn
+            self.worst_phases = self.current
+
+    def report(self):
+        if self.reported or not self.totals:
+            return
+        self.reported = True
+        lines = [f"turn timings over {len(self.totals)} turns (ms)", f"{'phase':<24}{'p50':>8}{'p95':>8}{'max':>8}"]
+        for phase, samples in list(self.phases.items()) + [("turn", self.totals)]:
+            ordered = sorted(samples)
+            lines.append(f"{phase:<24}{ordered[len(ordered)//2]:>8.2f}{ordered[int(0.95*(len(ordered)-1))]:>8.2f}{ordered[-1]:>8.2f}")
+        worst = ", ".join(f"{phase} {ms:.2f}" for phase, ms in self.worst_phases.items())
+        lines.append(f"worst turn {self.worst_turn}: {max(self.totals):.2f} ({worst})")
+        print("\n".join(lines), file=sys.stderr, flush=True)
+
+# diagnostics levels
+DEBUG, INFO, WARN, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warn": WARN, "error": ERROR, "off": 100}
+# binary trace record kinds
+TRACE_PLAN, TRACE_MONSTER, TRACE_SCORE = 1, 2, 3
+TRACE_HEADER = struct.Struct("<HBB")  # turn, kind, number of float32 values
+
+
+class Diagnostics:
+    # leveled stderr channel: messages below the level cost one comparison, the others are kept as
+    # (format, args) and only formatted and written, in a single call, when the turn is flushed
+    # MYIA_LOG_LEVEL picks the level, MYIA_TRACE=<file> also writes compact binary records, read by Tools/traces.py
+    def __init__(self, level: int = INFO, trace_path: str = ""):
+        self.level = level
+        self.pending: List[tuple] = []
+        self.turn = 0
+        self.trace_file = open(trace_path, "wb") if trace_path else None
+        if self.trace_file is None:
+            self.trace = lambda *args: None
+
+    @classmethod
+    def from_env(cls):
+        return cls(LEVELS.get(os.environ.get("MYIA_LOG_LEVEL", "info").lower(), INFO), os.environ.get("MYIA_TRACE", ""))
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, message: str, *args) -> None:
+        if level >= self.level:
+            self.pending.append((message, args))
+
+    def debug(self, message: str, *args) -> None:
+        if DEBUG >= self.level:
+            self.pending.append((message, args))
+
+    def info(self, message: str, *args) -> None:
+        if INFO >= self.level:
+            self.pending.append((message, args))
+
+    def warn(self, message: str, *args) -> None:
+        if WARN >= self.level:
+            self.pending.append((message, args))
+
+    def error(self, message: str, *args) -> None:
+        if ERROR >= self.level:
+            self.pending.append((message, args))
+
+    def trace(self, kind: int, *values: float) -> None:
+        self.trace_file.write(TRACE_HEADER.pack(self.turn, kind, len(values)))
+        self.trace_file.write(struct.pack(f"<{len(values)}f", *values))
+
+    def flush(self) -> None:
+        if self.pending:
+            sys.stderr.write("\n".join(message % args if args else message for message, args in self.pending) + "\n")
+            sys.stderr.flush()
+            self.pending.clear()
+        if self.trace_file is not None:
+            self.trace_file.flush()
+
+
 @dataclass
 class Vector:
     x: int
@@ -71,46 +197,122 @@ class Vector:
     
 
 
+# status codes held in Shoal.status
+STATUS_NAMES = ["not set", "still", "swimming", "Aggressive", "non-agressive"]
+NOT_SET, STILL, SWIMMING, AGGRESSIVE, NON_AGGRESSIVE = range(len(STATUS_NAMES))
+
+
 class Fish:
-    def __init__(self,fish_id: int,pos: Vector,prev_max_pos: Vector,prev_min_pos: Vector,curr_max_pos: Vector,curr_min_pos: Vector,
-    next_max_pos: Vector,next_min_pos: Vector, prev_speed: Vector,curr_speed: Vector, next_speed: Vector, color: int,  _type: int, status:str):
-        
-        self.fish_id = fish_id
-        self.pos = pos
-        self.prev_max_pos = prev_max_pos
-        self.prev_min_pos = prev_min_pos
-        self.curr_max_pos = curr_max_pos
-        self.curr_min_pos = curr_min_pos
-        self.next_max_pos = next_max_pos
-        self.next_min_pos = next_min_pos
-        self.prev_speed = prev_speed
-        self.curr_speed = curr_speed
-        self.next_speed = next_speed
-        self.color = color
-        self.type = _type
-        self.status = status
-        
+    # thin view on one creature of the Shoal arrays, so shoal[f].curr_pos() style calls keep working
+    def __init__(self, store, slot: int):
+        self.store = store
+        self.slot = slot
+
+    def _get(self, array) -> Vector:
+        return Vector(float(array[self.slot, 0]), float(array[self.slot, 1]))
+
+    def _set(self, array, value: Vector):
+        array[self.slot, 0] = value.x
+        array[self.slot, 1] = value.y
+
+    fish_id = property(lambda self: int(self.store.ids[self.slot]))
+    color = property(lambda self: int(self.store.color[self.slot]))
+    type = property(lambda self: int(self.store.type[self.slot]))
+    pos = property(lambda self: self._get(self.store.pos), lambda self, v: self._set(self.store.pos, v))
+    prev_min_pos = property(lambda self: self._get(self.store.prev_min), lambda self, v: self._set(self.store.prev_min, v))
+    prev_max_pos = property(lambda self: self._get(self.store.prev_max), lambda self, v: self._set(self.store.prev_max, v))
+    curr_min_pos = property(lambda self: self._get(self.store.curr_min), lambda self, v: self._set(self.store.curr_min, v))
+    curr_max_pos = property(lambda self: self._get(self.store.curr_max), lambda self, v: self._set(self.store.curr_max, v))
+    next_min_pos = property(lambda self: self._get(self.store.next_min), lambda self, v: self._set(self.store.next_min, v))
+    next_max_pos = property(lambda self: self._get(self.store.next_max), lambda self, v: self._set(self.store.next_max, v))
+    prev_speed = property(lambda self: self._get(self.store.prev_speed), lambda self, v: self._set(self.store.prev_speed, v))
+    curr_speed = property(lambda self: self._get(self.store.curr_speed), lambda self, v: self._set(self.store.curr_speed, v))
+    next_speed = property(lambda self: self._get(self.store.next_speed), lambda self, v: self._set(self.store.next_speed, v))
+
+    @property
+    def status(self) -> str:
+        return STATUS_NAMES[self.store.status[self.slot]]
+
+    @status.setter
+    def status(self, value: str):
+        self.store.status[self.slot] = STATUS_NAMES.index(value)
+
+    @property
+    def visible(self) -> bool:
+        return bool(self.store.visible[self.slot])
+
+    @visible.setter
+    def visible(self, value: bool):
+        self.store.visible[self.slot] = value
 
     def __str__ (self):
-        output = "id:"+str(self.fish_id)+" curr_pos:("+str(self.curr_min_pos.x)+"-"+str(self.curr_max_pos.x)+","
-        +str(self.curr_min_pos.y)+"-"+str(self.curr_max_pos.y)+")"
+        output = "id:"+str(self.fish_id)+" curr_pos:("+str(self.curr_min_pos.x)+"-"+str(self.curr_max_pos.x)+","+str(self.curr_min_pos.y)+"-"+str(self.curr_max_pos.y)+")"
         return output
 
-    def centre_pos(self) -> Vector:
-        centre_pos= (self.curr_max_pos+self.curr_min_pos)/2
-        return centre_pos
-    
-    def prev_pos(self) -> Vector:
-        prev_pos = (self.prev_max_pos+self.prev_min_pos)/2
-        return prev_pos
-    
     def curr_pos(self) -> Vector:
-        curr_pos = (self.curr_max_pos+self.curr_min_pos)/2
-        return curr_pos
-    
+        s = self.slot
+        if self.store.type[s] != -1:
+            # fish come from the particle tracker, monsters from their box
+            return self._get(self.store.mean)
+        return Vector(float(self.store.curr_min[s, 0]+self.store.curr_max[s, 0])/2, float(self.store.curr_min[s, 1]+self.store.curr_max[s, 1])/2)
+
     def next_pos(self) -> Vector:
-        next_pos = (self.next_max_pos+self.next_min_pos)/2
-        return next_pos
+        s = self.slot
+        if self.store.type[s] != -1:
+            return Vector(float(self.store.mean[s, 0]+self.store.drift[s, 0]), float(self.store.mean[s, 1]+self.store.drift[s, 1]))
+        return Vector(float(self.store.next_min[s, 0]+self.store.next_max[s, 0])/2, float(self.store.next_min[s, 1]+self.store.next_max[s, 1])/2)
+
+
+class Shoal:
+    # struct of arrays holding every creature: one row per creature, (x,y) in the last axis
+    # bounds and speeds live in two contiguous blocks so a whole turn can be shifted in one copy
+    def __init__(self, creatures: List[List[int]]):
+        n = len(creatures)
+        self.slot: Dict[int, int] = {}
+        self.ids = np.array([c[0] for c in creatures], dtype=np.int64)
+        self.color = np.array([c[1] for c in creatures], dtype=np.int64)
+        self.type = np.array([c[2] for c in creatures], dtype=np.int64)
+        self.status = np.zeros(n, dtype=np.int8)
+        self.visible = np.zeros(n, dtype=bool)
+        self.pos = np.full((n, 2), -1.0)
+        # prev_min, prev_max, curr_min, curr_max, next_min, next_max
+        self.bounds = np.zeros((6, n, 2))
+        self.bounds[1::2] = 10000
+        self.prev_min, self.prev_max, self.curr_min, self.curr_max, self.next_min, self.next_max = self.bounds
+        # prev_speed, curr_speed, next_speed
+        self.speeds = np.zeros((3, n, 2))
+        self.prev_speed, self.curr_speed, self.next_speed = self.speeds
+        # habitat box of each creature from the limits table
+        self.low = np.array([(0, limits[t+1][0]) for t in self.type], dtype=float).reshape(n, 2)
+        self.high = np.array([(10000, limits[t+1][1]) for t in self.type], dtype=float).reshape(n, 2)
+        # how far each creature can swim in a turn, from the limits table
+        self.reach = np.array([limits[t+1][2] for t in self.type], dtype=float)
+        # particle tracker estimate: mean position, standard deviation and mean speed of the cloud
+        self.mean = (self.low + self.high) / 2
+        self.spread = (self.high - self.low) / np.sqrt(12)
+        self.drift = np.zeros((n, 2))
+        self.views: List[Fish] = []
+        for s, c in enumerate(creatures):
+            self.slot[c[0]] = s
+            self.views.append(Fish(self, s))
+
+    def __getitem__(self, fish_id: int) -> Fish:
+        return self.views[self.slot[fish_id]]
+
+    def __contains__(self, fish_id: int) -> bool:
+        return fish_id in self.slot
+
+    def __iter__(self):
+        return iter(self.slot)
+
+    def __len__(self) -> int:
+        return len(self.slot)
+
+    def values(self) -> List[Fish]:
+        return self.views
+
+    def slots(self, fish_ids: List[int]) -> np.ndarray:
+        return np.array([self.slot[f] for f in fish_ids], dtype=np.int64)
 
 
 @dataclass
@@ -140,509 +342,952 @@ class Drone:
         self.avoid_path = avoid_path
         self.status = status
         self.light = light
-
-
-class Monster(Fish):
-    def __init__ (self,status:str = 'asleep'):
-        self.status = status
+        self.last_scans = set()
+        self.route: List[int] = []  # fish planned before the next surfacing
+
+
+class FoeObserver:
+    # the battery of each foe drone, a column a turn: a drop of 5 since the previous turn means the light was on
+    # a turn only writes its own column and compares it with the previous one, the history is never scanned again
+    # the referee scans every fish within 2000 of a lit drone (800 dark) that the drone's owner does not hold yet,
+    # so a new scan puts the fish inside that radius and a fish left unscanned is outside it
+    def __init__(self, drone_ids: List[int], turns: int = 201):
+        self.row = {d: i for i, d in enumerate(drone_ids)}
+        self.battery = np.full((len(drone_ids), turns), -1, dtype=np.int64)
+        self.sightings: List[Tuple[int, int, int]] = []  # this turn: (drone, fish, radius) the fish is within
+        self.misses: List[Tuple[int, int, np.ndarray]] = []  # this turn: (drone, radius, slots) the fish are beyond
+
+    def update(self, drones: List[Drone], new_scans: List[List[int]], alive: List[int], saved: List[int]) -> None:
+        t = g.turn
+        self.sightings = []
+        self.misses = []
+        fresh: Dict[int, List[int]] = {}
+        for drone_id, fish_id in new_scans:
+            fresh.setdefault(drone_id, []).append(fish_id)
+        for d in drones:
+            r = self.row[d.drone_id]
+            self.battery[r, t] = d.battery
+            before = self.battery[r, t-1]
+            if d.emergency:
+                light = 0
+            elif before < 0:
+                light = -1
+            elif d.battery == before - 5:
+                light = 1
+            elif d.battery == min(before + 1, 30):
+                light = 0
+            else:
+                light = -1
+            d.light = light == 1
+            if d.emergency:
+                continue
+            # an unknown light: the widest radius for what it saw, the narrowest for what it missed
+            for fish_id in fresh.get(d.drone_id, []):
+                self.sightings.append((d.drone_id, fish_id, 800 if light == 0 else 2000))
+            held = set(d.scans) | set(saved)
+            missed = [f for f in dict.fromkeys(alive) if f not in held and shoal.type[shoal.slot[f]] != -1]
+            if missed:
+                self.misses.append((d.drone_id, 2000 if light == 1 else 800, shoal.slots(missed)))
+
+
+class FoePredictor:
+    # for every fish, the turn the foe will bank it, for all foe drones and fish at once:
+    # a fish a drone carries when it surfaces, any other one after a straight trip to it and the climb
+    def __init__(self, shoal: Shoal):
+        self.shoal = shoal
+        self.bank_turn = np.full(len(shoal.type), np.inf)  # by slot
+
+    def update(self, drones: List[Drone], alive: List[int], saved: List[int]) -> None:
+        self.bank_turn[:] = np.inf
+        self.bank_turn[self.shoal.slots(saved)] = 0
+        drones = [d for d in drones if not d.emergency]  # an emergency drops the scans and stops the drone
+        fish = [f for f in dict.fromkeys(alive) if f not in saved and self.shoal.type[self.shoal.slot[f]] != -1]
+        if not drones:
+            return
+        pos = np.array([(d.pos.x, d.pos.y) for d in drones], dtype=float)
+        for d, climb in zip(drones, np.ceil(np.maximum(pos[:, 1] - 500, 0)/600)):
+            np.minimum.at(self.bank_turn, self.shoal.slots([f for f in d.scans if f in self.shoal.slot]), climb)
+        if fish:
+            slots = self.shoal.slots(fish)
+            at = self.shoal.mean[slots] + self.shoal.drift[slots]
+            reach = np.ceil(np.maximum(np.hypot(*(at[None, :, :] - pos[:, None, :]).transpose(2, 0, 1)) - 800, 0)/600)
+            bank = reach.min(axis=0) + np.ceil(np.maximum(at[:, 1] - 500, 0)/600) + 1
+            np.minimum.at(self.bank_turn, slots, bank)
+
+    def lost(self, my_bank: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """True for the fish the foe banks strictly before my_bank turns: their doubled first scan bonus is gone."""
+        return self.bank_turn[slots] < my_bank
+
+
+class ParticleFilter:
+    # a cloud of particles per fish, pushed by the fish speed and culled by what we learn each turn:
+    # habitat, radar quadrants from both drones, our lights not seeing it and foe scans seeing it
+    def __init__(self, shoal: Shoal, count: int = 256, seed: int = 0):
+        self.shoal = shoal
+        self.rng = np.random.default_rng(seed)  # fixed seed so transcripts replay exactly
+        self.slots = np.flatnonzero(shoal.type != -1)
+        self.row = np.full(len(shoal), -1)
+        self.row[self.slots] = np.arange(len(self.slots))
+        self.count = count
+        # habitat box and speed per fish, shaped to broadcast over its particles
+        self.low = shoal.low[self.slots].T[:, :, None].astype(np.float32)
+        self.high = shoal.high[self.slots].T[:, :, None].astype(np.float32)
+        self.speed = np.array([limits[t+1][2] for t in shoal.type[self.slots]], dtype=np.float32)[:, None]
+        # x, y, vx, vy planes of (fish, particle), float32 and contiguous to keep the batch cheap
+        self.state = np.empty((4, len(self.slots), count), dtype=np.float32)
+        self.state[:2] = self._scatter()
+        self.state[2:] = self._headings()
+
+    def _scatter(self) -> np.ndarray:
+        return self.low + self.rng.random((2, len(self.slots), self.count), dtype=np.float32) * (self.high - self.low)
+
+    def _headings(self) -> np.ndarray:
+        angle = self.rng.random((len(self.slots), self.count), dtype=np.float32) * np.float32(2 * np.pi)
+        return np.stack((np.cos(angle), np.sin(angle))) * self.speed
+
+    def _valid(self, x: np.ndarray, y: np.ndarray, drones: List[Drone], blips: List[RadarBlip], foe: FoeObserver) -> np.ndarray:
+        # False for every particle that contradicts this turn's information
+        valid = np.ones(x.shape, dtype=bool)
+        if blips:
+            rows = self.row[self.shoal.slots([rb.fish_id for rb in blips])]
+            keep = rows >= 0
+            ref = np.array([(drone_by_id[rb.drone_id].pos.x, drone_by_id[rb.drone_id].pos.y) for rb in blips], dtype=np.float32)[keep]
+            left = np.array([rb.dir[1] == "L" for rb in blips])[keep, None]
+            top = np.array([rb.dir[0] == "T" for rb in blips])[keep, None]
+            rows = rows[keep]
+            ok = (x[rows] < ref[:, 0:1]) == left
+            ok &= (y[rows] < ref[:, 1:2]) == top
+            np.logical_and.at(valid, rows, ok)
+        # anything hidden inside our light radius would have been seen
+        hidden = ~self.shoal.visible[self.slots][:, None]
+        for drone in drones:
+            radius = 2000 if drone.light else 800
+            valid &= ((x - drone.pos.x)**2 + (y - drone.pos.y)**2 > radius*radius) | ~hidden
+        # a foe scan puts the fish within the foe's light radius, a fish the foe did not scan is beyond it
+        for drone_id, fish_id, radius in foe.sightings:
+            r = self.row[self.shoal.slot[fish_id]]
+            ref_pos = drone_by_id[drone_id].pos
+            valid[r] &= (x[r] - ref_pos.x)**2 + (y[r] - ref_pos.y)**2 <= radius*radius
+        for drone_id, radius, slots in foe.misses:
+            rows = self.row[slots]
+            rows = rows[rows >= 0]
+            ref_pos = drone_by_id[drone_id].pos
+            valid[rows] &= ((x[rows] - ref_pos.x)**2 + (y[rows] - ref_pos.y)**2 > radius*radius) | ~hidden[rows]
+        return valid
+
+    def update(self, drones: List[Drone], blips: List[RadarBlip], foe: FoeObserver) -> None:
+        n, count = len(self.slots), self.count
+        state = self.state
+        pos, vel = state[:2], state[2:]
+        # fish keep their heading with some wobble, a few particles start afresh after a flee or an avoid
+        vel += (self.rng.random((2, n, count), dtype=np.float32) - np.float32(0.5)) * self.speed
+        vel *= self.speed / np.maximum(np.sqrt(vel[0]*vel[0] + vel[1]*vel[1]), np.float32(1e-3))
+        fresh = self.rng.random((n, count), dtype=np.float32) < 0.1
+        # take the heading of another particle of the same fish, reversed
+        np.negative(vel[:, :, self.rng.permutation(count)], out=vel, where=fresh)
+        pos += vel
+        # bounce on the habitat edges
+        np.negative(vel, out=vel, where=(pos < self.low) | (pos > self.high))
+        np.clip(pos, self.low, self.high, out=pos)
+
+        valid = self._valid(state[0], state[1], drones, blips, foe)
+        alive = valid.sum(axis=1)
+        lost = alive == 0
+        if lost.any():
+            # the cloud missed the fish: scatter it again over the habitat and keep what fits
+            state[:2, lost] = self._scatter()[:, lost]
+            state[2:, lost] = self._headings()[:, lost]
+            fresh_valid = self._valid(state[0], state[1], drones, blips, foe)[lost]
+            valid[lost] = fresh_valid | (fresh_valid.sum(axis=1) == 0)[:, None]
+            alive = valid.sum(axis=1)
+
+        # resample every cloud from its surviving particles, in one gather
+        order = np.argsort(~valid, axis=1, kind="stable")
+        pick = (self.rng.random((n, count), dtype=np.float32) * alive[:, None]).astype(np.int64)
+        index = order[np.arange(n)[:, None], pick] + (np.arange(n) * count)[:, None]
+        state = self.state = np.take(state.reshape(4, -1), index.ravel(), axis=1).reshape(4, n, count)
+
+        # fish in sight collapse to their exact position and speed
+        seen = self.shoal.visible[self.slots]
+        if seen.any():
+            slots = self.slots[seen]
+            state[:2, seen] = self.shoal.pos[slots].T[:, :, None]
+            state[2:, seen] = self.shoal.curr_speed[slots].T[:, :, None]
+
+        mean = state.mean(axis=2, dtype=np.float64)
+        square = (state[:2]**2).mean(axis=2, dtype=np.float64)
+        self.shoal.mean[self.slots] = mean[:2].T
+        self.shoal.spread[self.slots] = np.sqrt(np.maximum(square - mean[:2]**2, 0)).T
+        self.shoal.drift[self.slots] = mean[2:].T
+
+
+class MonsterForecast:
+    # every known or suspected monster rolled forward turn by turn with the referee's rules:
+    # a drone within 800 (2000 when lit) draws it at 540, otherwise it slows back to its 270 patrol,
+    # bouncing on the map sides and the habitat; worked out once per turn and shared by every path check
+    def __init__(self, horizon: int = 8):
+        self.horizon = horizon
+        self.turn = -1
+        self.slots = np.zeros(0, dtype=np.int64)
+        # turn 0 is now, turn h the end of the h-th move: centre and speed of each monster,
+        # radius of the disc it may be anywhere in, and whether it is chasing a drone
+        self.centre = np.zeros((horizon+1, 0, 2))
+        self.speed = np.zeros((horizon+1, 0, 2))
+        self.radius = np.zeros((horizon+1, 0))
+        self.chasing = np.zeros((horizon+1, 0), dtype=bool)
+
+    def forecast(self) -> "MonsterForecast":
+        # the turn is only marked done once the rollout is complete: an alarm in the middle of it leaves it stale
+        if self.turn != g.turn:
+            self._roll()
+            self.turn = g.turn
+        return self
+
+    def _roll(self) -> None:
+        m = np.flatnonzero(shoal.type == -1)
+        seen = shoal.visible[m]
+        size = np.hypot(*(shoal.curr_max[m] - shoal.curr_min[m]).T)/2
+        # a monster whose box is still wide is only a guess, too vague to plan around
+        known = seen | (size < 2000)
+        m, seen, size = m[known], seen[known], size[known]
+        self.slots = m
+        count, horizon = len(m), self.horizon
+        self.centre = np.zeros((horizon+1, count, 2))
+        self.speed = np.zeros((horizon+1, count, 2))
+        self.radius = np.zeros((horizon+1, count))
+        self.chasing = np.zeros((horizon+1, count), dtype=bool)
+        if count == 0:
+            return
+
+        pos = np.where(seen[:, None], shoal.pos[m], (shoal.curr_min[m] + shoal.curr_max[m])/2)
+        speed = shoal.curr_speed[m].copy()
+        mag = np.hypot(speed[:, 0], speed[:, 1])
+        chase_speed, patrol_speed = PARAMS["monster_chase"], PARAMS["monster_patrol"]
+        speed *= np.minimum(1, chase_speed/np.maximum(mag, 1))[:, None]
+        self.chasing[0] = mag > 500
+
+        # drones that can draw a monster: ours where they are, foes carried on by their last move
+        drones = [d for d in drone_by_id.values() if not d.emergency]
+        drone_pos = np.array([(d.pos.x, d.pos.y) for d in drones], dtype=float).reshape(-1, 2)
+        drone_speed = np.array([(d.speed.x, d.speed.y) if d.owner == "foe" else (0, 0) for d in drones], dtype=float).reshape(-1, 2)
+        reach = np.array([2000 if d.light else 800 for d in drones], dtype=float)
+
+        self.centre[0], self.speed[0], self.radius[0] = pos, speed, np.where(seen, 0, size)
+        for h in range(1, horizon+1):
+            pos = pos + speed
+            np.clip(pos[:, 0], 0, 9999, out=pos[:, 0])
+            np.clip(pos[:, 1], 2500, 9999, out=pos[:, 1])
+            at = np.clip(drone_pos + drone_speed*h, 0, 9999)
+            gap = at[None, :, :] - pos[:, None, :]
+            d2 = gap[..., 0]**2 + gap[..., 1]**2
+            d2 = np.where(d2 <= reach**2, d2, np.inf)
+            prey = np.argmin(d2, axis=1) if len(drones) else np.zeros(count, dtype=np.int64)
+            chase = np.isfinite(d2.min(axis=1)) if len(drones) else np.zeros(count, dtype=bool)
+            towards = gap[np.arange(count), prey] if len(drones) else speed
+            towards = towards/np.maximum(np.hypot(towards[:, 0], towards[:, 1]), 1)[:, None]*chase_speed
+            patrol = speed/np.maximum(np.hypot(speed[:, 0], speed[:, 1]), 1)[:, None]*patrol_speed
+            speed = np.where(chase[:, None], towards, patrol)
+            out_x = (pos[:, 0] + speed[:, 0] < 0) | (pos[:, 0] + speed[:, 0] > 9999)
+            out_y = (pos[:, 1] + speed[:, 1] < 2500) | (pos[:, 1] + speed[:, 1] > 9999)
+            speed[out_x, 0] *= -1
+            speed[out_y, 1] *= -1
+            speed = np.round(speed)
+            self.centre[h], self.speed[h], self.chasing[h] = pos, speed, chase
+            # an unseen monster may have turned anywhere at patrol speed
+            self.radius[h] = self.radius[0] + np.where(seen, 0, patrol_speed*h)
+
+    def clearance(self, path: np.ndarray) -> np.ndarray:
+        """Distance from each drone path (paths, turns, 2) to the nearest monster region, turn for turn."""
+        turns = min(path.shape[1], self.horizon)
+        if len(self.slots) == 0 or turns == 0:
+            return np.full(path.shape[0], np.inf)
+        gap = path[:, :turns, None, :] - self.centre[None, 1:turns+1]
+        dist = np.sqrt(gap[..., 0]**2 + gap[..., 1]**2) - self.radius[None, 1:turns+1]
+        return dist.min(axis=(1, 2))
+
+
+class MonsterTracker:
+    # probability grid per monster over its habitat, 250 units a cell, fed by everything that hints where it is:
+    # sightings, radar quadrants, our lights missing it, chases and the emergencies of any drone
+    cell = 250
+    rows, cols = (10000 - 2500) // 250, 10000 // 250
+    box_mass = 1e-3  # probability left outside the box handed back to the shoal, a quarter per side at most
+
+    def __init__(self):
+        self.slots = np.flatnonzero(shoal.type == -1)
+        self.row = {int(s): r for r, s in enumerate(self.slots)}
+        self.grid = np.full((len(self.slots), self.rows, self.cols), 1.0/(self.rows*self.cols))
+        self.x = (np.arange(self.cols) + 0.5)*self.cell
+        self.y = 2500 + (np.arange(self.rows) + 0.5)*self.cell
+        self.emergency: Dict[int, bool] = {}
+        self.turn = -1
+        self.danger = np.zeros((self.rows, self.cols))
+
+    def _index(self, x, y):
+        i = np.clip(((np.asarray(y) - 2500)//self.cell).astype(np.int64), 0, self.rows-1)
+        j = np.clip((np.asarray(x)//self.cell).astype(np.int64), 0, self.cols-1)
+        return i, j
+
+    def _spread(self, grid: np.ndarray) -> np.ndarray:
+        # mass each cell gathers from the 5x5 block around it: how far a monster goes in a turn (540)
+        pad = np.pad(grid, ((0, 0), (2, 2), (2, 2)))
+        rows = sum(pad[:, k:k+self.rows, :] for k in range(5))
+        return sum(rows[:, :, k:k+self.cols] for k in range(5))
+
+    def _radar(self, grid: np.ndarray, blips: List[RadarBlip], keep: np.ndarray) -> None:
+        for rb in blips:
+            r = self.row.get(int(shoal.slot[rb.fish_id]), -1)
+            if r < 0 or not keep[r]:
+                continue
+            ref = drone_by_id[rb.drone_id].pos
+            half = self.cell/2
+            cols = self.x - half < ref.x if rb.dir[1] == "L" else self.x + half > ref.x
+            rows = self.y - half < ref.y if rb.dir[0] == "T" else self.y + half > ref.y
+            grid[r] *= rows[:, None] & cols[None, :]
+
+    def update(self, drones: List[Drone], blips: List[RadarBlip]) -> None:
+        if len(self.slots) == 0:
+            return
+        seen = shoal.visible[self.slots]
+        grid = self.grid.copy()
+        if forecast.turn == g.turn - 1:
+            # monsters seen last turn went where last turn's rollout sent them, chasing or patrolling
+            last = forecast.radius[0] == 0
+            i, j = self._index(forecast.centre[1, last, 0], forecast.centre[1, last, 1])
+            rows = [self.row[int(s)] for s in forecast.slots[last]]
+            grid[rows] = 0
+            grid[rows, i, j] = 1
+        grid = self._spread(grid)
+
+        # sightings pin the monster to one cell
+        grid[seen] = 0
+        i, j = self._index(shoal.pos[self.slots, 0], shoal.pos[self.slots, 1])
+        grid[seen, i[seen], j[seen]] = 1
+
+        # a drone that just went into emergency was hit by a monster that is still close by
+        for drone in drone_by_id.values():
+            if drone.emergency and not self.emergency.get(drone.drone_id, True):
+                close = np.hypot(self.x[None, :] - drone.pos.x, self.y[:, None] - drone.pos.y) < 1200
+                grid[~seen] *= 1 + 3*close
+            self.emergency[drone.drone_id] = drone.emergency
+
+        hidden = ~seen
+        self._radar(grid, blips, hidden)
+        # our lights show monsters 300 further than fish: cells well inside that disc are empty
+        for drone in drones:
+            radius = (2000 if drone.light else 800) + 300 - self.cell*0.71
+            lit = np.hypot(self.x[None, :] - drone.pos.x, self.y[:, None] - drone.pos.y) < radius
+            grid[hidden] *= ~lit
+
+        total = grid.sum(axis=(1, 2))
+        lost = total == 0
+        if lost.any():
+            # the guesses ran out: start again from the radar alone
+            grid[lost] = 1
+            self._radar(grid, blips, lost)
+            total = grid.sum(axis=(1, 2))
+        self.grid = grid/np.maximum(total, 1e-12)[:, None, None]
+
+        # hand the cells holding all but box_mass of the monster back to its interval box:
+        # each side is trimmed on the cumulative mass of the rows or columns, never on a single cell
+        tail = self.box_mass/4
+        for r in np.flatnonzero(hidden):
+            s = self.slots[r]
+            row_mass = np.cumsum(self.grid[r].sum(axis=1))
+            col_mass = np.cumsum(self.grid[r].sum(axis=0))
+            top, bottom = np.argmax(row_mass > tail), np.argmax(row_mass >= row_mass[-1] - tail)
+            left, right = np.argmax(col_mass > tail), np.argmax(col_mass >= col_mass[-1] - tail)
+            low = np.maximum(shoal.curr_min[s], (left*self.cell, 2500 + top*self.cell))
+            high = np.minimum(shoal.curr_max[s], ((right+1)*self.cell - 1, 2500 + (bottom+1)*self.cell - 1))
+            if (low <= high).all():
+                shoal.curr_min[s], shoal.curr_max[s] = low, high
+
+    def risk(self, x, y):
+        """Chance that a monster the rollout does not follow is within 500 of (x, y), for points or arrays of them."""
+        if self.turn != g.turn:
+            unknown = np.isin(self.slots, forecast.forecast().slots, invert=True)
+            near = np.minimum(self._spread(self.grid[unknown]), 1)
+            self.danger = 1 - np.prod(1 - near, axis=0) if unknown.any() else np.zeros((self.rows, self.cols))
+            self.turn = g.turn
+        i, j = self._index(x, y)
+        return self.danger[i, j]
+
+
+class LightScheduler:
+    # the light of a drone planned several turns ahead: every on/off schedule at once, each scored by the fish
+    # it should reveal, the battery it leaves and the known monsters its light would draw in
+    # only the first turn is played, the schedule is worked out again next turn
+    def __init__(self, horizon: int = 6):
+        self.horizon = horizon
+        # bit t of a schedule lights the drone on turn t; the schedules are sorted by how many turns they
+        # light, so the first best one argmax returns is also the darkest
+        schedules = ((np.arange(1 << horizon)[:, None] >> np.arange(horizon)[None, :]) & 1).astype(bool)
+        self.schedules = schedules[np.argsort(schedules.sum(axis=1), kind="stable")]
+
+    def plan(self, drone: Drone, target: Vector) -> np.ndarray:
+        """On/off for each of the next turns, the drone carrying on towards target at full speed."""
+        steps = np.arange(1, self.horizon+1)
+        heading = (target - drone.pos).unit()*600
+        path = np.clip(np.array([drone.pos.x, drone.pos.y]) + np.array([heading.x, heading.y])*steps[:, None], 0, 9999)
+
+        # battery: a light asked for with less than 5 left stays off
+        lit = np.zeros(self.schedules.shape, dtype=bool)
+        battery = np.full(len(self.schedules), float(drone.battery))
+        for t in range(self.horizon):
+            lit[:, t] = self.schedules[:, t] & (battery >= 5)
+            battery = np.where(lit[:, t], battery - 5, np.minimum(battery + 1, 30))
+        score = PARAMS["battery_value"]*battery
+
+        # fish worth points, found when within the light radius, blurred by how unsure the tracker is
+        fish = np.flatnonzero(shoal.type != -1)
+        values = np.array([score_book.fish_points(int(f)) for f in shoal.ids[fish]], dtype=float)
+        fish, values = fish[values > 0], values[values > 0]
+        if len(fish):
+            at = np.clip(shoal.mean[fish] + shoal.drift[fish]*steps[:, None, None], shoal.low[fish], shoal.high[fish])
+            d = np.hypot(path[:, None, 0] - at[..., 0], path[:, None, 1] - at[..., 1])
+            blur = np.maximum(np.hypot(shoal.spread[fish, 0], shoal.spread[fish, 1]), 100)
+            seen_lit = np.clip((2000 - d)/(2*blur) + 0.5, 0, 1)
+            seen_dark = np.clip((800 - d)/(2*blur) + 0.5, 0, 1)
+            # a fish found sooner is worth more: the drone has not closed in yet, so it has not fled
+            seen = np.where(lit[:, :, None], seen_lit, seen_dark)
+            unseen = np.cumprod(1 - seen, axis=1)
+            first = seen*np.concatenate([np.ones((len(seen), 1, len(fish))), unseen[:, :-1]], axis=1)
+            score += (first*PARAMS["scan_discount"]**steps[None, :, None]).sum(axis=1) @ values
+
+        # a known monster between 800 and 2000 only comes for a lit drone
+        roll = forecast.forecast()
+        turns = min(self.horizon, roll.horizon)
+        if len(roll.slots) and turns:
+            gap = path[:turns, None, :] - roll.centre[1:turns+1]
+            d = np.hypot(gap[..., 0], gap[..., 1]) - roll.radius[1:turns+1]
+            wake = ((d >= 800) & (d < 2000)).any(axis=1)
+            stake = score_for_scan(drone.scans) if drone.scans else 0
+            score -= PARAMS["wake_cost"]*(stake + 5)*(lit[:, :turns] & wake[None, :]).sum(axis=1)
+        # ties go to the darkest schedule, the first of them in self.schedules
+        return lit[int(np.argmax(score))]
 
 
 # general functions
 
-def dot (a : Vector,b :Vector) -> float:
-    output = (a.x*b.x,a.y*b.y)
-    return output
-    
-    
 def dist(a:Vector,b:Vector)-> float:
     distance = math.sqrt((a.x-b.x)**2+(a.y-b.y)**2)
     return distance
 
 
-def score_for_scan(scans:List[int])->int:
-        score_to_add = 0
-        my_types = [0,0,0]
-        my_colors = [0,0,0,0]
-        foe_types = [0,0,0]
-        foe_colors = [0,0,0,0]
-        for ms in my_scans:
-            my_types[shoal[ms].type] +=1
-            my_colors[shoal[ms].color] +=1
-        for fs in foe_scans:
-            foe_types[shoal[fs].type] +=1
-            foe_colors[shoal[fs].color] +=1
-    
-        for s in scans:
-            if s not in my_scans:
-                my_types[shoal[s].type] += 1
-                my_colors[shoal[s].color] += 1
-                if s not in foe_scans:
-                    score_to_add += (shoal[s].type+1)*2
-                else:
-                    score_to_add += (shoal[s].type+1)
-                if my_types[shoal[s].type] == 4 and foe_types[shoal[s].type] <4:
-                    score_to_add += 8
-                if my_types[shoal[s].type] == 4 and foe_types[shoal[s].type] ==4:
-                    score_to_add += 4
-                if my_colors[shoal[s].color] == 3 and foe_colors[shoal[s].color] <3:
-                    score_to_add += 6
-                if my_colors[shoal[s].color] == 3 and foe_colors[shoal[s].color] ==3:
-                    score_to_add += 3  
-        print(f"scan score t{my_types} c{my_colors}",  file=sys.stderr, flush=True)
-        return score_to_add
-
-# given the position and speed of two objects 
-# return two position Vectors equal to their locations at closest approach
-def closest_approach(pos1 : Vector,speed1: Vector,pos2: Vector,speed2 : Vector) -> List[Vector]:
-    # move to origin
-    p1 = pos1 - pos1 # (0,0)
-    p2 = pos2 - pos1
-    # move refernce frame so origin is stationary
-    s1 = speed1 - speed1 # (0,0)
-    s2 = speed2 - speed1
-
-# equation for point 1 in time is pos1 + t*speed1
-# equation for point 2 in time is pos2 + t*speed2
-    
-# translating to origin
-# p1(t) = pos1-pos1 + t*speed1 = t*speed1
-# p2(t) = pos2-pos1 + t*speed2 = p2 + t*speed2
 
-# translating so origin is staionary
-# p1(t) = t*speed1 - t*speed1 = 0
-# p2(t) = p2 + t*(speed2 - speed1) = p2 + s2
+# number of set bits for the 3 type bits and 4 color bits
+BITS = [bin(i).count("1") for i in range(16)]
+
+
+class ScanMasks:
+    # scan sets encoded as bitmasks over the scorable fish (at most 12, so at most 4096 masks)
+    # per-mask tables are built once at startup, scoring any surfacing is then a few lookups
+    def __init__(self, fish: List[List[int]]):
+        self.bit: Dict[int, int] = {}
+        type_masks = [0,0,0]
+        color_masks = [0,0,0,0]
+        values = []
+        for i, (fish_id, color, _type) in enumerate(fish):
+            self.bit[fish_id] = 1 << i
+            type_masks[_type] |= 1 << i
+            color_masks[color] |= 1 << i
+            values.append((_type+1, 1 << _type, 1 << color))
+        self.type_masks = type_masks
+        self.color_masks = color_masks
+        size = 1 << len(fish)
+        self.all = size-1
+        # base points of the fish in the mask, and which types/colors the mask touches or completes
+        self.points = [0]*size
+        self.touched_types = [0]*size
+        self.touched_colors = [0]*size
+        self.full_types = [0]*size
+        self.full_colors = [0]*size
+        for m in range(1, size):
+            low = (m & -m).bit_length()-1
+            rest = m & (m-1)
+            value, type_bit, color_bit = values[low]
+            self.points[m] = self.points[rest] + value
+            self.touched_types[m] = self.touched_types[rest] | type_bit
+            self.touched_colors[m] = self.touched_colors[rest] | color_bit
+            full = 0
+            for t, tm in enumerate(type_masks):
+                if tm and m & tm == tm:
+                    full |= 1 << t
+            self.full_types[m] = full
+            full = 0
+            for c, cm in enumerate(color_masks):
+                if cm and m & cm == cm:
+                    full |= 1 << c
+            self.full_colors[m] = full
+        # the same tables as arrays, to score many masks at once
+        self.points_array = np.array(self.points, dtype=np.int64)
+        self.full_types_array = np.array(self.full_types, dtype=np.int64)
+        self.full_colors_array = np.array(self.full_colors, dtype=np.int64)
+        self.bits_array = np.array(BITS, dtype=np.int64)
+
+    def mask(self, fish_ids) -> int:
+        m = 0
+        for f in fish_ids:
+            m |= self.bit.get(f, 0)
+        return m
+
+    # points banked by saving the scans mask, given what both players have already saved
+    def bank_points(self, scans: int, mine: int, foe: int) -> int:
+        new = scans & ~mine
+        points = 2*self.points[new & ~foe] + self.points[new & foe]
+        types = self.full_types[mine | new] & ~self.full_types[mine]
+        colors = self.full_colors[mine | new] & ~self.full_colors[mine]
+        points += 4*(BITS[types] + BITS[types & ~self.full_types[foe]])
+        points += 3*(BITS[colors] + BITS[colors & ~self.full_colors[foe]])
+        return points
+
+    # bank_points for an array of scans masks
+    # out and work (3 rows shaped like scans) can be given so that a hot loop does not allocate
+    def bank_points_many(self, scans: np.ndarray, mine: int, foe: int, out: np.ndarray = None, work: np.ndarray = None) -> np.ndarray:
+        if out is None:
+            out = np.empty(scans.shape, dtype=np.int64)
+        if work is None:
+            work = np.empty((3,) + scans.shape, dtype=np.int64)
+        new, mask, bits = work
+        np.bitwise_and(scans, ~mine, out=new)
+        np.bitwise_and(new, ~foe, out=mask)
+        np.take(self.points_array, mask, out=out)
+        out *= 2
+        np.bitwise_and(new, foe, out=mask)
+        np.take(self.points_array, mask, out=mask)
+        out += mask
+        np.bitwise_or(new, mine, out=new)
+        # the combos completed by new, each worth double unless the foe completed it already
+        for full_array, full, weight in ((self.full_types_array, self.full_types, 4), (self.full_colors_array, self.full_colors, 3)):
+            np.take(full_array, new, out=mask)
+            mask &= ~full[mine]
+            np.take(self.bits_array, mask, out=bits)
+            bits *= weight
+            out += bits
+            mask &= ~full[foe]
+            np.take(self.bits_array, mask, out=bits)
+            bits *= weight
+            out += bits
+        return out
+
+
+class ScoreBook:
+    # saved and carried scans of both players as masks
+    # updated incrementally each turn, so the points of a surfacing or of one more scan are table lookups
+    def __init__(self, masks: ScanMasks):
+        self.masks = masks
+        self.my_saved = 0
+        self.foe_saved = 0
+        self.carried = 0
+        self.carried_points = 0
+        self.extra_points: Dict[int, int] = {}
+
+    # saved scans only ever grow, so nothing is recomputed unless a mask changed
+    def update(self, my_scans:List[int], foe_scans:List[int], carried:List[int]) -> None:
+        my_saved = self.my_saved | self.masks.mask(my_scans)
+        foe_saved = self.foe_saved | self.masks.mask(foe_scans)
+        carried = self.masks.mask(carried) & ~my_saved
+        if (my_saved, foe_saved, carried) == (self.my_saved, self.foe_saved, self.carried) and self.extra_points:
+            return
+        self.my_saved, self.foe_saved, self.carried = my_saved, foe_saved, carried
+        self.carried_points = self.surface_points(carried)
+        for f, bit in self.masks.bit.items():
+            if bit & (my_saved | carried):
+                self.extra_points[f] = 0
+            else:
+                self.extra_points[f] = self.surface_points(carried | bit) - self.carried_points
 
+    # points we would bank if the scans mask was saved now
+    def surface_points(self, scans: int) -> int:
+        return self.masks.bank_points(scans, self.my_saved, self.foe_saved)
 
-# dot product of moving object and perpendicular = 0
-# moving object = s2
-# perpendicular = p2 + t*s2
-# dot(s2,(p2-t*s2) = 0)
-# s2.x* p2.x + t*s2.x*s2.x + s2.y*p2.y + ts2.y*s2.y = 0
-# s2.x*p2.x + s2.y*2.y = - t*(s2.x^2+s2.y^2)
-# so - t = (s2.x*p2.x + s2.y*p2.y) / ( s2.x^2 + s2.y^2)
+    # extra points brought by scanning fish f, on top of what the drones already carry
+    def fish_points(self, f:int) -> int:
+        return self.extra_points.get(f, 0)
 
-# so position of 1 = pos 1 + t * speed1
 
-    if (s2.x*s2.x+s2.y*s2.y) == 0:
-        t=0
+def score_for_scan(scans:List[int])->int:
+    scan_mask = scan_masks.mask(scans) & ~score_book.my_saved
+    if scan_mask == score_book.carried:
+        return score_book.carried_points
+    return score_book.surface_points(scan_mask)
+
+
+# closest approach of every drone x heading x monster combination
+# drone_pos (D,2), headings (H,2) or (D,H,2) unit vectors, monster_pos and monster_speed (M,2)
+# returns the time of closest approach and the miss distance, both shaped (D,H,M)
+# t is clamped to [0,horizon] turns, a negative t means they are already separating
+def closest_approach_batch(drone_pos: np.ndarray, headings: np.ndarray, speed: float, monster_pos: np.ndarray,
+                           monster_speed: np.ndarray, horizon: float = np.inf):
+    if headings.ndim == 2:
+        headings = headings[None, :, :]
+    # move to the drone's reference frame so the drone sits still at the origin
+    p = monster_pos[None, None, :, :] - drone_pos[:, None, None, :]
+    v = monster_speed[None, None, :, :] - headings[:, :, None, :]*speed
+    vv = v[..., 0]*v[..., 0] + v[..., 1]*v[..., 1]
+    pv = p[..., 0]*v[..., 0] + p[..., 1]*v[..., 1]
+    t = np.clip(-pv/np.where(vv == 0, 1, vv), 0, horizon)
+    cx = p[..., 0] + v[..., 0]*t
+    cy = p[..., 1] + v[..., 1]*t
+    return t, np.sqrt(cx*cx + cy*cy)
+
+
+# candidate escape headings, every 10 degrees
+HEADINGS = np.stack([np.cos(np.radians(np.arange(0, 360, 10))), np.sin(np.radians(np.arange(0, 360, 10)))], axis=1)
+
+
+# slots of the monsters whose position is known this turn
+def tracked_monsters() -> np.ndarray:
+    return np.flatnonzero((shoal.type == -1) & shoal.visible)
+
+
+# slots of the tracked monsters that could come within miss_dist of the drone this turn
+def monsters_near(d:Drone, speed:float, miss_dist:float) -> np.ndarray:
+    m = tracked_monsters()
+    reach = speed + PARAMS["monster_chase"] + miss_dist
+    return m[(shoal.pos[m, 0] - d.pos.x)**2 + (shoal.pos[m, 1] - d.pos.y)**2 <= reach*reach]
+
+
+# keep the planned move if no tracked monster comes within miss_dist during the next turn
+# otherwise take the safe heading closest to the planned one, or the one that misses by the most
+def escape_path(d:Drone, planned:Vector, speed:int, miss_dist:float = PARAMS["miss_distance"]) -> Vector:
+    m = monsters_near(d, speed, miss_dist)
+    if len(m) == 0:
+        return planned
+    unit = planned.unit()
+    headings = np.vstack([[unit.x, unit.y], HEADINGS])
+    _, miss = closest_approach_batch(np.array([[d.pos.x, d.pos.y]], dtype=float), headings, speed,
+                                     shoal.pos[m], shoal.curr_speed[m], horizon=1)
+    worst = miss[0].min(axis=1)
+    if worst[0] >= miss_dist:
+        return planned
+    safe = np.flatnonzero(worst[1:] >= miss_dist)
+    if len(safe):
+        best = safe[np.argmax(HEADINGS[safe] @ np.array([unit.x, unit.y]))]
     else:
-        t = -1* ((s2.x*p2.x)+(s2.y*p2.y))/(s2.x*s2.x+s2.y*s2.y)
-
-    if t>0:
-        cpos1 = Vector(int(pos1.x+(t*speed1.x)),int(pos1.y+(t*speed1.y)))
-        cpos2 = Vector(int(pos2.x+(t*speed2.x)),int(pos2.y+(t*speed2.y)))
-    if t<=0:
-        cpos1 = pos1
-        cpos2 = pos2
-    
-    return (cpos1,cpos2,t)
+        best = np.argmax(worst[1:])
+    log.info("Escaping monster heading %s miss %d", HEADINGS[best], worst[0])
+    return Vector(float(HEADINGS[best, 0]), float(HEADINGS[best, 1]))*speed
 
 
-# test functions
-
-def closest_test():
-    print(f"testing closest for 0,0 0,0 1000,1000 0,-1", file=sys.stderr, flush=True)
-    ca = closest_approach(Vector(0,0),Vector(0,0),Vector(1000,1000),Vector(0,-1))
-    print(f"{ca}", file=sys.stderr, flush=True)
-
-
-def monsters_in_way(d:Drone,dir:Vector) ->bool:
-    trouble = False
-    for m in monsters:
-        closest_positions = closest_approach(d.pos,dir.unit()*600,m[1],m[2])
-        c_dist = dist(closest_positions[0],closest_positions[1])
-        if c_dist < 1000:
-            trouble = True
-            
-    return trouble
-
-        
 def foe_possible_score(oppo_scan:List) -> int:
-    score_matrix = [[0 for x in range(3)] for y in range(4)]
-    poss_score = 0
-    types = [2,2,2]
-    colors = [2,2,2,2]
-    live_fish = []
-    for rb in my_radar_blips:
-        if rb.fish_id not in live_fish and shoal[rb.fish_id].type != -1 :
-            live_fish.append(rb.fish_id)
-    for cr in shoal:
-        if shoal[cr].type != -1:
-            cr_score = 0
-            cr_type = shoal[cr].type
-            cr_color = shoal[cr].color
-            if cr not in live_fish:
-                cr_score = 0
-                types[cr_type] = 0
-                colors[cr_color] = 0
-            elif cr in oppo_scan:
-                cr_score = 1
-                types[cr_type] = min(1,types[cr_type])
-                colors[cr_color] = min(1,types[cr_type])
-            else:
-                cr_score = 2
-                
-            score_matrix[cr_color][cr_type] = cr_score
-
-    for row in range(4):
-        for col in range(3):
-            poss_score += score_matrix[row][col]*(col+1)
-
-    poss_score += sum(types)*4
-    poss_score += sum(colors)*3    
-
-    return poss_score    
+    # fish still in the game score double unless oppo_scan already holds them
+    # a type or color bonus needs all its fish alive, and is halved if oppo_scan holds one of them
+    live = scan_masks.mask([rb.fish_id for rb in my_radar_blips])
+    oppo = scan_masks.mask(oppo_scan) & live
+    poss_score = 2*scan_masks.points[live & ~oppo] + scan_masks.points[oppo]
+    types = scan_masks.full_types[live]
+    colors = scan_masks.full_colors[live]
+    poss_score += (2*BITS[types] - BITS[types & scan_masks.touched_types[oppo]])*4
+    poss_score += (2*BITS[colors] - BITS[colors & scan_masks.touched_colors[oppo]])*3
+
+    return poss_score
 
 def update_fish () ->None:
-    # work out the new minx position for all the shoal given the new drone and radar information
-
-    # update based on previous location
-    # crop based on radar
-    # crop based on min max y
-    # crop based on foe drone seeing the fish
-
-    for cr in shoal:
-        
-        # enlarge the min max area based on possible creature speed
-        shoal[cr].prev_min_pos = shoal[cr].curr_min_pos
-        shoal[cr].prev_max_pos = shoal[cr].curr_max_pos
-        shoal[cr].prev_speed = shoal[cr].curr_speed
-        
-        #crop the possible area by the limits for each type of fish - held in the limits list
-        shoal[cr].curr_min_pos = Vector(max(0,shoal[cr].curr_min_pos.x),max(shoal[cr].curr_min_pos.y,limits[shoal[cr].type+1][0]))
-        shoal[cr].curr_max_pos = Vector(min(10000,shoal[cr].curr_max_pos.x),min(shoal[cr].curr_max_pos.y,limits[shoal[cr].type+1][1]))
-        
-        #crop the possible area by the position of a foe drone if its been seen this turn - held in foe_new_scans
-        nscr = []
-        for ns in foe_new_scans:
-            if ns[1] ==cr:
-                nscr.append[ns]
-        
-        for nsc in nscr:
-            light_range = 2000
-            shoal[cr].curr_min_pos = Vector(max(shoal[cr].curr_min_pos.x,drone_by_id[nsc[0]].pos.x-light_range), max(shoal[cr].curr_min_pos.y,drone_by_id[nsc[0]].pos.y-2000))
-            shoal[cr].curr_max_pos = Vector(min(shoal[cr].curr_max_pos.x,drone_by_id[nsc[0]].pos.x+light_range), min(shoal[cr].curr_max_pos.y,drone_by_id[nsc[0]].pos.y+2000))
-        
-            # could be less than 2000 if we can work out if the drone light was on or off from the bttery history
-            
-        
-    for rb in my_radar_blips:
-        
-        curr_min_pos = shoal[rb.fish_id].curr_min_pos
-        curr_max_pos = shoal[rb.fish_id].curr_max_pos
-        ref_pos = drone_by_id[rb.drone_id].pos
-        #crop the possible area by the results of the radar
-        if rb.dir[1]=="L":
-                curr_min_pos.x = min(curr_min_pos.x,ref_pos.x)
-                curr_max_pos.x = min(curr_max_pos.x,ref_pos.x)
-        if rb.dir[1]=="R":
-                curr_min_pos.x = max(curr_min_pos.x,ref_pos.x)
-                curr_max_pos.x = max(curr_max_pos.x,ref_pos.x)
-        if rb.dir[0]=="T":
-                curr_min_pos.y = min(curr_min_pos.y,ref_pos.y)
-                curr_max_pos.y = min(curr_max_pos.y,ref_pos.y)
-        if rb.dir[0]=="B":
-                curr_min_pos.y = max(curr_min_pos.y,ref_pos.y)
-                curr_max_pos.y = max(curr_max_pos.y,ref_pos.y)
-        
-        #crop the possible area by the limits for each type of fish
-        
-        shoal[rb.fish_id].curr_min_pos = Vector(max(0,curr_min_pos.x),max(curr_min_pos.y,limits[shoal[rb.fish_id].type+1][0]))
-        shoal[rb.fish_id].curr_max_pos = Vector(min(10000,curr_max_pos.x),min(curr_max_pos.y,limits[shoal[rb.fish_id].type+1][1]))
-        shoal[rb.fish_id].curr_speed = shoal[rb.fish_id].curr_pos()-shoal[rb.fish_id].prev_pos()
-        
-
-def end_of_turn_positions(shoal:Dict[int,Fish]):
-    for creature in shoal.values():
-        if creature.type == -1:
-            monster=creature
-            if monster.curr_speed.mag() > 500 or monster.status == "aggressive":
-                monster.next_speed = monster.curr_speed.unit()*270
-                monster.status = "non-agressive"
-            else:
-                monster.next_speed = monster.curr_speed
-            drone_prox = 100000
-            closest_drone = ""
-            for drone in drone_by_id.values():
-                drone_dist = dist(drone.pos,monster.curr_pos())
-                if drone_dist < 800 + (drone.light * 1200):
-                    if drone_dist < drone_prox:
-                        drone_dost = drone_prox
-                        closest_drone = drone
-                    # monster into agressive status
-                    monster.status = 'Aggressive'
-                    # head towards closest drone
-                    chase_dir = drone.pos - monster.curr_pos()
-                    chase_speed = 540
-                    monster.next_speed = chase_dir.unit()*chase_speed
-                    monster.next_max_pos = monster.curr_max_pos+monster.next_speed
-                    monster.next_min_pos = monster.curr_min_pos+monster.next_speed
-                    print(f"hello monster {monster.fish_id}", file=sys.stderr, flush=True)
-            
-                
-            # test for proximity of drones
-            # if any within ??? find the closest
-            # monster will move towards the closest drone with aggressive speed
-            pass
-            # if none nearby then continue to move as before
-            
-        if creature.type in (0,1,2):
-            #use current position and speed to predict next position
-            creature.next_max_pos = creature.curr_max_pos + creature.curr_speed
-            creature.next_min_pos = creature.curr_min_pos + creature.curr_speed
-        
+    # interval propagation of every hidden creature's box, all creatures at once:
+    # last turn's box grows by how far the creature can swim, then each piece of news cuts it down
+    #   habitat from limits, foe scans (within 2000 of the foe drone), radar quadrants, our lights not seeing it
+
+    # keep last turn's boxes and speeds, one copy for the whole shoal
+    shoal.bounds[0:2] = shoal.bounds[2:4]
+    shoal.prev_speed[:] = shoal.curr_speed
+    hidden = ~shoal.visible
+    if not hidden.any():
+        return
+
+    # grow: fish swim at their limits speed but flee at 400 when a drone comes within 1400
+    low, high = shoal.prev_min.copy(), shoal.prev_max.copy()
+    fish = shoal.type != -1
+    drones = np.array([(d.pos.x, d.pos.y) for d in drone_by_id.values()], dtype=float)
+    gap = np.maximum(np.maximum(low[:, None] - drones, drones - high[:, None]), 0)
+    near = fish & ((gap**2).sum(axis=2).min(axis=1) < (1400 + shoal.reach)**2)
+    reach = np.where(near, 400, shoal.reach)
+    low -= reach[:, None]
+    high += reach[:, None]
+    np.maximum(low, shoal.low, out=low)
+    np.minimum(high, shoal.high, out=high)
+
+    #crop the possible area by the position of a foe drone if its been seen this turn
+    #the radius is 800 when the battery history shows the foe's light was off
+    for drone_id, fish_id, light_range in foe_observer.sightings:
+        s = shoal.slot[fish_id]
+        ref_pos = drone_by_id[drone_id].pos
+        low[s] = np.maximum(low[s], (ref_pos.x-light_range, ref_pos.y-light_range))
+        high[s] = np.minimum(high[s], (ref_pos.x+light_range, ref_pos.y+light_range))
+
+    #crop the possible area by the results of the radar, all blips at once
+    def radar_cut(keep: np.ndarray) -> None:
+        for axis, low_side in ((0, left), (1, top)):
+            below, above = keep & low_side, keep & ~low_side
+            np.minimum.at(high[:, axis], slots[below], blip_ref[below, axis] - 1)
+            np.maximum.at(low[:, axis], slots[above], blip_ref[above, axis])
+
+    if my_radar_blips:
+        slots = shoal.slots([rb.fish_id for rb in my_radar_blips])
+        blip_ref = np.array([(drone_by_id[rb.drone_id].pos.x, drone_by_id[rb.drone_id].pos.y) for rb in my_radar_blips], dtype=float)
+        left = np.array([rb.dir[1] == "L" for rb in my_radar_blips])
+        top = np.array([rb.dir[0] == "T" for rb in my_radar_blips])
+        radar_cut(np.ones(len(slots), dtype=bool))
+
+    # our lights did not see it, or a foe did not scan it: trim the sides of the box the disc covers end to end
+    # (each disc's trim holds on its own, so all discs are applied at once)
+    mine = [d for d in drone_by_id.values() if d.owner == "me"]
+    ref = np.array([(d.pos.x, d.pos.y) for d in mine] + [(drone_by_id[d].pos.x, drone_by_id[d].pos.y) for d, _, _ in foe_observer.misses], dtype=float)
+    radius = np.array([2000 if d.light else 800 for d in mine] + [r for _, r, _ in foe_observer.misses])[None, :] + np.where(fish, 0, 300)[:, None]  # monsters show 300 further
+    applies = np.ones((len(fish), len(ref)), dtype=bool)
+    for k, (_, _, missed) in enumerate(foe_observer.misses):
+        applies[:, len(mine)+k] = False
+        applies[missed, len(mine)+k] = True
+    far = np.maximum(np.abs(low[:, None] - ref), np.abs(high[:, None] - ref))
+    # half width of the band where the disc covers the full extent of the other axis
+    band = np.sqrt(np.maximum(radius[:, :, None]**2 - far[:, :, ::-1]**2, 0))
+    covered = (band > 0) & applies[:, :, None]
+    trim_low = covered & (ref - band <= low[:, None]) & (low[:, None] <= ref + band)
+    trim_high = covered & (ref - band <= high[:, None]) & (high[:, None] <= ref + band)
+    low = np.maximum(low, np.where(trim_low, ref + band, -np.inf).max(axis=1))
+    high = np.minimum(high, np.where(trim_high, ref - band, np.inf).min(axis=1))
+
+    # a box the cuts emptied means a guess was wrong (a flee, an avoid): fall back to habitat and radar
+    empty = hidden & (low > high).any(axis=1)
+    if empty.any():
+        low[empty] = shoal.low[empty]
+        high[empty] = shoal.high[empty]
+        if my_radar_blips:
+            radar_cut(empty[slots])
+
+    shoal.curr_min[hidden] = low[hidden]
+    shoal.curr_max[hidden] = high[hidden]
+    if my_radar_blips:
+        seen = np.unique(slots[hidden[slots]])
+        shoal.curr_speed[seen] = (shoal.curr_min[seen]+shoal.curr_max[seen]-shoal.prev_min[seen]-shoal.prev_max[seen])/2
+
+
+def end_of_turn_positions(shoal:Shoal):
+    #fish: use current position and speed to predict next position
+    shoal.next_min[:] = shoal.curr_min + shoal.curr_speed
+    shoal.next_max[:] = shoal.curr_max + shoal.curr_speed
+
+    # monsters: first turn of the rollout, the ones we know nothing about keep their box and speed
+    roll = forecast.forecast()
+    m = roll.slots
+    if len(m) == 0:
+        return
+    shoal.status[m] = np.where(roll.chasing[1], AGGRESSIVE, NON_AGGRESSIVE)
+    if log.enabled(DEBUG):
+        for f in shoal.ids[m[roll.chasing[1]]]:
+            log.debug("hello monster %d", f)
+    shoal.next_speed[m] = roll.speed[1]
+    shift = roll.centre[1] - roll.centre[0]
+    shoal.next_min[m] = shoal.curr_min[m] + shift
+    shoal.next_max[m] = shoal.curr_max[m] + shift
 
 
 def show_game_state():
-    print(f"************************************", file=sys.stderr, flush=True)
-    print(f"At the start of turn {g.turn}", file=sys.stderr, flush=True)
-    print(f"************************************", file=sys.stderr, flush=True)
+    if not log.enabled(DEBUG):
+        return
+    log.debug("************************************")
+    log.debug("At the start of turn %d", g.turn)
+    log.debug("************************************")
     for d in drone_by_id:
         if d==0 or d==2:
-            print(f"Drone {d} is at {drone_by_id[d].pos}", file=sys.stderr, flush=True)
-            print(f"{drone_by_id[d].status}", file=sys.stderr, flush=True)
-            print(f"-----------:--------------------------------------", file=sys.stderr, flush=True)
+            log.debug("Drone %d is at %s", d, drone_by_id[d].pos)
+            log.debug("%s", drone_by_id[d].status)
+            log.debug("-----------:--------------------------------------")
             for cr in visible_fish:
                 if shoal[cr].type == -1:
-                    print(f"monster {cr} at {shoal[cr].pos} heading {shoal[cr].curr_speed} dist: {int(dist(drone_by_id[d].pos,shoal[cr].curr_pos()))}", file=sys.stderr, flush=True)
-            print(f"************************************", file=sys.stderr, flush=True)    
+                    log.debug("monster %d at %s heading %s dist: %d", cr, shoal[cr].pos, shoal[cr].curr_speed, dist(drone_by_id[d].pos,shoal[cr].curr_pos()))
+            log.debug("************************************")
 
                         
 def current_value(f):
     #set the value of a given fish based on the type and who has already scanned / landed that fish color / type
-    base_value = shoal[f].type
-    fish_value = base_value
-    if f not in foe_scans:
-        fish_value *= 2
-
-    return base_value
+    return score_book.fish_points(f)
 
 # for a given drone_id return the value of going to the surface
 def surface_value(d: int) -> int:
-    payload_value = 0
-    for s in drone_by_id[d].scans:
-        if s not in foe_scans:
-            payload_value += (shoal[s].type+1)
-            #TODO add value of all color and all type points
-        for fd in foe_drones:
-            if s in drone_by_id[fd.drone_id].scans:
-                payload_value += (shoal[s].type+1)*2
-
+    payload = scan_masks.mask(drone_by_id[d].scans)
+    payload_value = scan_masks.points[payload & ~score_book.foe_saved]
+    #TODO add value of all color and all type points
+    for fd in foe_drones:
+        payload_value += scan_masks.points[payload & scan_masks.mask(drone_by_id[fd.drone_id].scans)]*2
 
     return payload_value
 
-def drone_time_to_surface(d:int)->int:
-    time_to_surface = math.ceil((drone_by_id[d].pos.y-500)/600)
-    return time_to_surface
-
-def turns_to_target(pos:Vector,tar:Vector,speed:int) -> int:
-    distance = dist(pos,tar)
-    turns = math.ceil(distance/speed)
-    return turns
-
-def next_move(pos:Vector, target:Vector,speed:int) -> Vector:
-    move = target - pos
-    unit_move = move.unit()
-    next_step = unit_move * speed
-    next_step.x = int(next_step.x)
-    next_step.y = int(next_step.y)
-    move = next_step + pos
-    return move
-
 def best_speed(d:Drone) -> int:
     if d.pos.y<2500:
-        bspeed = 600
+        bspeed = PARAMS["shallow_speed"]
     else:
-        bspeed = 600
+        bspeed = PARAMS["drone_speed"]
     return bspeed
 
-def closest_monster(d:Drone):
-    prox = 100000
-    cm = ''
-    for m in monsters:
-        if dist(m[1],d.pos)<prox:
-            prox = dist(m[1],d.pos)
-            cm = m[0]
-    return cm
-
-def closest_target(d:int) ->int:
-    prox = 100000
-    ct = -1
-    for t in targets:
-        distance = dist(shoal[t.target_id].curr_pos(),drone_by_id[d].pos)
-        if distance <prox:
-            prox = distance
-            ct = t.target_id
-    print(f"Closest Target = {ct} at {int(prox)}", file=sys.stderr, flush=True)       
-    return ct
-
-
-def closest_fish_dist(d:Drone):
-    prox = 100000
-    for f in shoal:
-        if shoal[f].type != -1:
-            fdist = dist(drone_by_id[d].pos,shoal[f].centre_pos())
-            if fdist<prox:
-                prox = fdist
-    return prox
-
-
-## function to help check for overlapping line segments
-
-# Given three collinear points p, q, r, the function checks if  
-# point q lies on line segment 'pr'  
-def onSegment(p, q, r): 
-    if ( (q.x <= max(p.x, r.x)) and (q.x >= min(p.x, r.x)) and 
-        (q.y <= max(p.y, r.y)) and (q.y >= min(p.y, r.y))): 
-        return True
-    return False
-
-def orientation(p:Vector, q:Vector, r:Vector): 
-    # to find the orientation of an ordered triplet (p,q,r) 
-    # function returns the following values: 
-    # 0 : Collinear points 
-    # 1 : Clockwise points 
-    # 2 : Counterclockwise 
-    
-    # See https://www.geeksforgeeks.org/orientation-3-ordered-points/amp/  
-    # for details of below formula.  
-    
-    val = (float(q.y - p.y) * (r.x - q.x)) - (float(q.x - p.x) * (r.y - q.y)) 
-    if (val > 0): 
-        
-        # Clockwise orientation 
-        return 1
-    elif (val < 0): 
-        
-        # Counterclockwise orientation 
-        return 2
-    else: 
-        
-        # Collinear orientation 
-        return 0
-
-# The main function that returns true if  
-# the line segment 'p1q1' and 'p2q2' intersect. 
-def doIntersect(p1,q1,p2,q2): 
-    
-    # Find the 4 orientations required for  
-    # the general and special cases 
-    o1 = orientation(p1, q1, p2) 
-    o2 = orientation(p1, q1, q2) 
-    o3 = orientation(p2, q2, p1) 
-    o4 = orientation(p2, q2, q1) 
-
-    # General case 
-    if ((o1 != o2) and (o3 != o4)): 
-        return True
-
-    # Special Cases 
-
-    # p1 , q1 and p2 are collinear and p2 lies on segment p1q1 
-    if ((o1 == 0) and onSegment(p1, p2, q1)): 
-        return True
-
-    # p1 , q1 and q2 are collinear and q2 lies on segment p1q1 
-    if ((o2 == 0) and onSegment(p1, q2, q1)): 
-        return True
-
-    # p2 , q2 and p1 are collinear and p1 lies on segment p2q2 
-    if ((o3 == 0) and onSegment(p2, p1, q2)): 
-        return True
-
-    # p2 , q2 and q1 are collinear and q1 lies on segment p2q2 
-    if ((o4 == 0) and onSegment(p2, q1, q2)): 
-        return True
-
-    # If none of the cases 
-    return False
-
-def edge_move(d:Drone, t:Vector) -> Vector:
-    
-
-    #TODO refactor to change d from drone to Vector
-    # find speed of drone
-    dspeed = dist(d.pos,t)
-
-    # find intercept with edge at proposed vector
-    right_edge = (Vector(100001,-1),Vector(100001,100001))
-    left_edge = (Vector(-1,-1),Vector(-1,10001))
-    top_edge = (Vector(-1,-1),Vector(10001,-1))
-    bottom_edge = (Vector(-1,10001),Vector(10001,10001))
-    proposed_target = t
-    proposed_move = t-d.pos
-
-    if doIntersect(right_edge[0],right_edge[1],d.pos,proposed_target):
-        #intersects with right edge
-        proposed_move.x = 9999-d.pos.x
-        proposed_move.y = math.sqrt(dspeed**2-(proposed_move.x)**2)
-        print(f"Avoiding right wall", file=sys.stderr, flush=True)
-
-
-    if doIntersect(left_edge[0],left_edge[1],d.pos,proposed_target):
-        #intersects with left edge
-        proposed_move.x = 1-d.pos.x
-        proposed_move.y = math.sqrt(dspeed**2-(proposed_move.x)**2)
-        print(f"Avoiding left wall", file=sys.stderr, flush=True)
-
-    if d.pos.y+proposed_move.y>10000:
-        proposed_target.y = d.pos.y - proposed_move.y
-    else:
-        proposed_target.y = d.pos.y + proposed_move.y
-
-    if doIntersect(top_edge[0],top_edge[1],d.pos,proposed_target):
-        #intersects with top edge
-        proposed_move.y = 1-d.pos.y
-        proposed_move.x= proposed_move.x
-        print(f"Avoiding top", file=sys.stderr, flush=True)
-
-
-    if doIntersect(bottom_edge[0],bottom_edge[1],d.pos,proposed_target):
-        #intersects with bottom edge
-        proposed_move.y = 9999-d.pos.y
-        proposed_move.x = math.sqrt(dspeed**2-(proposed_move.x)**2)
-        print(f"Avoiding bottom", file=sys.stderr, flush=True)
-
-    if d.pos.x+proposed_move.x>10000:
-        proposed_target.x = d.pos.x - proposed_move.x
-    else:
-        proposed_target.x = d.pos.x + proposed_move.x
-
-    return proposed_target
-
-    # find vector that intercepts edge at disrtance = speed
-
-    # find intercept that is closest to original intercept
-
-    # deal with case where bothe are equal
-
-    # propose that intercept as move
-
-    # what about corner cases where its off two sides?
-    if d.pos.y>10000:
-        #bottom
-        pass
-
-    if d.pos.y<0:
-        #top
-        pass
-
-    if d.pos.x>10000:
-        pass
-
-    if d.pos.x<0:
-        pass
-
-#given a fish and a dronbe give the best move to chase the fish off the edge
-def chase_move(d:Drone, f:Fish) ->Vector:
-    pass
-
 
 def new_targets():
     for rb in my_radar_blips:
         if shoal[rb.fish_id].type != -1:
             targets.append(Target(rb.fish_id,current_value(rb.fish_id),"none"))
 
+
+def hungarian(cost: List[List[float]]) -> List[int]:
+    """Column given to each row for the smallest total cost, rows <= columns (shortest augmenting paths)."""
+    n, m = len(cost), len(cost[0]) if cost else 0
+    # 1-based potentials, column 0 is the virtual start of each augmenting path
+    u = [0.0]*(n+1)
+    v = [0.0]*(m+1)
+    owner = [0]*(m+1)
+    way = [0]*(m+1)
+    for row in range(1, n+1):
+        owner[0] = row
+        col = 0
+        low = [math.inf]*(m+1)
+        used = [False]*(m+1)
+        while owner[col]:
+            used[col] = True
+            r = owner[col]
+            delta, nxt = math.inf, 0
+            cost_r, u_r = cost[r-1], u[r]
+            for j in range(1, m+1):
+                if not used[j]:
+                    reduced = cost_r[j-1] - u_r - v[j]
+                    if reduced < low[j]:
+                        low[j], way[j] = reduced, col
+                    if low[j] < delta:
+                        delta, nxt = low[j], j
+            for j in range(m+1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    low[j] -= delta
+            col = nxt
+        while col:
+            prev = way[col]
+            owner[col] = owner[prev]
+            col = prev
+    given = [-1]*n
+    for j in range(1, m+1):
+        if owner[j]:
+            given[owner[j]-1] = j-1
+    return given
+
+
+SURFACE = -1
+RISK_STEPS = 3  # turns of the straight run to a fish checked against the monster forecast
+GAME_TURNS = 200
+LAST_DIVE = 16  # turns to climb from the bottom of the map
+
+
+class RoutePlanner:
+    # the best ordered set of fish to scan before surfacing, by points banked per turn, exact by subset DP
+    # tail[s, i] is the fewest turns to scan fish i, then the rest of subset s, then reach the surface:
+    # it does not depend on the drone, so it is worked out once per turn and shared by both drones
+    max_fish = int(PARAMS["route_fish"])  # longest route worked out, past that the scans carried are better banked first
+
+    def __init__(self):
+        self.layers: Dict[int, List[np.ndarray]] = {}
+        self.fish: List[int] = []
+        self.at = np.zeros((0, 2))
+        self.subsets = np.zeros(1, dtype=np.int64)
+        self.tail = np.zeros((1, 0))
+        self.masks = np.zeros(1, dtype=np.int64)
+
+    def _layers(self, k: int) -> List[np.ndarray]:
+        # subsets of k fish grouped by size, built once for each k
+        if k not in self.layers:
+            subsets = np.arange(1 << k)
+            size = sum((subsets >> i) & 1 for i in range(k)) if k else np.zeros(1, dtype=np.int64)
+            self.layers[k] = [subsets[size == c] for c in range(k+1)]
+        return self.layers[k]
+
+    def round_trip(self) -> int:
+        return 2 if GAME_TURNS - g.turn > 2*LAST_DIVE else 1
+
+    def update(self, fish: List[int], at: np.ndarray) -> None:
+        """Fish worth scanning and where they will be: travel times between them and the DP over subsets."""
+        k = len(fish)
+        self.fish, self.at = fish, at
+        gap = at[:, None, :] - at[None, :, :]
+        # a fish is scanned from 800 away, so a hop is 800 shorter than the distance
+        hop = np.maximum(np.hypot(gap[..., 0], gap[..., 1]) - 800, 0)/600
+        # a surfacing also costs the dive back, unless the game ends before another round trip
+        climb = np.maximum(at[:, 1] - 500, 0)/600*self.round_trip()
+        bit = 1 << np.arange(k)
+        tail = np.full((1 << k, k), np.inf)
+        tail[bit, np.arange(k)] = climb
+        # one layer of subsets at a time: scan i, then go on with the rest of the subset
+        for layer in self._layers(k)[2:self.max_fish+1]:
+            for i in range(k):
+                sets = layer[(layer & bit[i]) != 0]
+                tail[sets, i] = (tail[sets ^ bit[i]] + hop[i][None, :]).min(axis=1)
+        # only the subsets short enough to be routes, the empty one first
+        self.subsets = np.concatenate(self._layers(k)[:self.max_fish+1])
+        self.tail = tail[self.subsets]
+        # scan mask of every subset
+        self.masks = np.zeros(len(self.subsets), dtype=np.int64)
+        for i, f in enumerate(fish):
+            self.masks |= ((self.subsets >> i) & 1)*scan_masks.bit[f]
+
+    def rates(self, drone: Drone, foe_first: int = 0) -> Tuple[np.ndarray, np.ndarray, float]:
+        """For each fish, the best points per turn of a route starting with it and the route's subset;
+        then the points per turn of surfacing straight away. The fish in foe_first are scored as if the
+        foe had already saved them."""
+        carried = scan_masks.mask(drone.scans) & ~score_book.my_saved
+        points = scan_masks.bank_points_many(self.masks | carried, score_book.my_saved, score_book.foe_saved | foe_first)
+        surface = points[0]/(max(drone.pos.y - 500, 0)/600*self.round_trip() + 1)
+        if not self.fish:
+            return np.zeros(0), np.zeros(0, dtype=np.int64), surface
+        reach = np.maximum(np.hypot(self.at[:, 0] - drone.pos.x, self.at[:, 1] - drone.pos.y) - 800, 0)/600
+        total = reach[None, :] + self.tail + 1
+        # a route that cannot surface before the end of the game banks nothing
+        rate = np.where(total <= GAME_TURNS - g.turn + 1, points[:, None]/total, 0)
+        best = np.argmax(rate, axis=0)
+        return rate[best, np.arange(len(self.fish))], self.subsets[best], surface
+
+
+def assign_targets(drones: List[Drone]) -> Dict[int, int]:
+    """Fish (or SURFACE) for each drone, chosen jointly so two drones never chase the same fish.
+
+    A drone and fish pair is worth the best route starting with that fish, in points banked per turn,
+    lowered by the chance of meeting a monster on the way, which also puts what the drone carries at stake.
+    Every drone has its own surface column, worth its carried scans over the time to climb.
+    A fish the foe is predicted to bank before the drone could is worth its single scan only.
+    """
+    if not drones:
+        return {}
+    # one target per radar blip, so each fish is listed once per drone
+    fish = [f for f in dict.fromkeys(t.target_id for t in targets) if score_book.fish_points(f) > 0]
+    slots = shoal.slots(fish)
+    at = (shoal.mean[slots] + shoal.drift[slots]).reshape(-1, 2)  # Fish.next_pos for every fish at once
+    routes.update(fish, at)
+    pos = np.array([(d.pos.x, d.pos.y) for d in drones], dtype=float)
+    carried = np.array([score_for_scan(d.scans) if d.scans else 0 for d in drones], dtype=float)
+
+    gap = at[None, :, :] - pos[:, None, :]
+    distance = np.hypot(gap[..., 0], gap[..., 1])
+    turns = np.maximum(distance - 800, 0)/600 + 1
+    risk = np.broadcast_to(monster_tracker.risk(at[:, 0], at[:, 1]), distance.shape).copy()
+    if len(fish):
+        # straight run towards each fish, one drone step a turn
+        step = gap/np.maximum(distance, 1)[..., None]*np.minimum(distance, 600)[..., None]
+        path = pos[:, None, None, :] + step[:, :, None, :]*np.arange(1, RISK_STEPS+1)[None, None, :, None]
+        clear = forecast.forecast().clearance(np.clip(path, 0, 9999).reshape(-1, RISK_STEPS, 2))
+        risk = np.maximum(risk, 0.75*(clear.reshape(distance.shape) < 800))
+
+    # the soonest this drone could bank each fish, against the foe's prediction
+    lost = foe_predictor.lost(turns + np.maximum(at[:, 1] - 500, 0)[None, :]/600, slots)
+    bits = np.array([scan_masks.bit[f] for f in fish], dtype=np.int64)
+
+    cost = np.full((len(drones), len(fish) + len(drones)), 1e9)
+    subsets = []
+    for r, d in enumerate(drones):
+        rate, subset, surface = routes.rates(d, int(np.bitwise_or.reduce(bits[lost[r]], initial=0)))
+        cost[r, :len(fish)] = -(rate*(1 - risk[r]) - risk[r]*carried[r]/turns[r])
+        cost[r, len(fish) + r] = -surface
+        subsets.append(subset)
+    given = hungarian(cost.tolist())
+    for d, c, subset in zip(drones, given, subsets):
+        d.route = [f for i, f in enumerate(fish) if (subset[c] >> i) & 1] if c < len(fish) else []
+    return {d.drone_id: fish[c] if c < len(fish) else SURFACE for d, c in zip(drones, given)}
+
 # global variables and lists
 #limits holds maximum for x,y and speed of each creature type
 limits=[(2500,10000,540),(2500,5000,200),(5000,7500,200),(7500,10000,200)]
@@ -654,204 +1299,453 @@ foe_drones: List[Drone] = []
 visible_fish: Dict[int,Fish] = {}
 my_radar_blips: List[RadarBlip] = []
 targets: List[Target] = []
-shoal: Dict[int, Fish] = {}
-planned_path = Vector(0,0)
+shoal: Shoal = None
+tracker: ParticleFilter = None
+foe_observer: FoeObserver = None
+foe_predictor: FoePredictor = None
+monster_tracker: MonsterTracker = None
+scan_masks: ScanMasks = None
+score_book: ScoreBook = None
 my_score = 0
 foe_score = 0
 
-def initialise_game():
-    
-    fish_count = int(input())
-    for _ in range(fish_count):
+class TurnState:
+    # one decoded turn block, the same object is refilled every turn
+    def __init__(self, max_creatures: int = 0):
+        self.my_score = 0
+        self.foe_score = 0
+        self.my_scans: List[int] = []
+        self.foe_scans: List[int] = []
+        self.my_drones: List[List[int]] = []   # droneId x y emergency battery
+        self.foe_drones: List[List[int]] = []
+        self.drone_scans: List[List[int]] = []  # droneId creatureId
+        self.visible = np.zeros((max_creatures, 5), dtype=np.int64)  # creatureId x y vx vy
+        self.visible_count = 0
+        self.radar: List[RadarBlip] = []
+        self.radar_count = 0
+
+
+class TurnDecoder:
+    # reads whole blocks from a binary stream (stdin, a pipe or a transcript) and parses them token by token
+    # a turn is normally one read() call, integers are converted a slice at a time
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdin.buffer
+        self.tokens: List[bytes] = []
+        self.pos = 0
+        self.partial = b""
+        self.turn = TurnState()
+        self.turn_start = 0.0
+
+    def _fill(self) -> None:
+        read = getattr(self.stream, "read1", None) or self.stream.read
+        chunk = read(65536)
+        if not chunk:
+            raise EOFError("end of input")
+        data = self.partial + chunk
+        self.tokens = self.tokens[self.pos:]
+        self.pos = 0
+        if data[-1:].isspace():
+            self.partial = b""
+            self.tokens.extend(data.split())
+        else:
+            # the last token may continue in the next chunk
+            words = data.split()
+            self.partial = words.pop()
+            self.tokens.extend(words)
+
+    def _int(self) -> int:
+        while self.pos >= len(self.tokens):
+            self._fill()
+        self.pos += 1
+        return int(self.tokens[self.pos-1])
+
+    def _ints(self, n: int) -> List[int]:
+        while len(self.tokens) - self.pos < n:
+            self._fill()
+        values = list(map(int, self.tokens[self.pos:self.pos+n]))
+        self.pos += n
+        return values
+
+    def _rows(self, width: int) -> List[List[int]]:
+        values = self._ints(self._int()*width)
+        return [values[i:i+width] for i in range(0, len(values), width)]
+
+    def read_init(self) -> List[List[int]]:
+        creatures = self._rows(3)
+        self.turn = TurnState(len(creatures))
+        return creatures
+
+    def read_turn(self) -> TurnState:
+        t = self.turn
+        t.my_score = self._int()
+        self.turn_start = time.perf_counter()  # the clock starts once the referee has sent the turn
+        t.foe_score = self._int()
+        t.my_scans[:] = self._ints(self._int())
+        t.foe_scans[:] = self._ints(self._int())
+        t.my_drones[:] = self._rows(5)
+        t.foe_drones[:] = self._rows(5)
+        t.drone_scans[:] = self._rows(2)
+        count = self._int()
+        if count > len(t.visible):
+            t.visible = np.zeros((count, 5), dtype=np.int64)
+        t.visible[:count] = np.array(self._ints(count*5), dtype=np.int64).reshape(count, 5)
+        t.visible_count = count
+        count = self._int()
+        while self.pos + count*3 > len(self.tokens):
+            self._fill()
+        for i in range(count):
+            drone_id, fish_id, direction = self.tokens[self.pos:self.pos+3]
+            self.pos += 3
+            if i < len(t.radar):
+                blip = t.radar[i]
+                blip.drone_id, blip.fish_id, blip.dir = int(drone_id), int(fish_id), direction.decode()
+            else:
+                t.radar.append(RadarBlip(int(drone_id), int(fish_id), direction.decode()))
+        t.radar_count = count
+        return t
+
 
-        fish_id, color, _type = map(int, input().split())
-        new_fish = Fish(fish_id,Vector(-1,-1),Vector(10000,10000),Vector(0,0),Vector(10000,10000),Vector(0,0),Vector(10000,10000),
-                        Vector(0,0),Vector(0,0),Vector(0,0),Vector(0,0),color,_type,"not set")
-        shoal[fish_id] = new_fish
+decoder: TurnDecoder = None
+
+
+def initialise_game():
+    global shoal, scan_masks, score_book, decoder, tracker, monster_tracker, foe_observer, foe_predictor
+    decoder = TurnDecoder()
+    creatures = decoder.read_init()
+    shoal = Shoal(creatures)
+    tracker = ParticleFilter(shoal)
+    monster_tracker = MonsterTracker()
+    scan_masks = ScanMasks([c for c in creatures if c[2] != -1])
+    score_book = ScoreBook(scan_masks)
 
 
     for d in range(4):
         new_drone = Drone(d,Vector(-1,-1),False,-1,[],'',Vector(-1,-1),0)
         drone_by_id[d] = new_drone
+    foe_observer = FoeObserver(list(drone_by_id), GAME_TURNS + 2)
+    foe_predictor = FoePredictor(shoal)
 
 
 def initialise_loop():
-    my_scans.clear()
-    foe_scans.clear()
+    global my_score, foe_score
     foe_new_scans.clear()
     foe_drones.clear()
     visible_fish.clear()
-    my_radar_blips.clear()
     targets.clear()
-    
-    my_score = int(input())
-    foe_score = int(input())
-
-    my_scan_count = int(input())
-    for _ in range(my_scan_count):
-        fish_id = int(input())
-        my_scans.append(fish_id)
-
-    foe_scan_count = int(input())
-    for _ in range(foe_scan_count):
-        fish_id = int(input())
-        foe_scans.append(fish_id)
-
-    my_drone_count = int(input())
-    for _ in range(my_drone_count):
-        drone_id, drone_x, drone_y, emergency, battery = map(int, input().split())
-        dpos = Vector(drone_x, drone_y)
-        
-        #find the old position of the drone if we know it to use to calculate the drone speed
-        if drone_id in drone_by_id:
-            old_pos = drone_by_id[drone_id].pos
-        else:
-            old_pos = dpos
-
-        drone_by_id[drone_id].pos = dpos
-        drone_by_id[drone_id].emergency = (emergency == '1')
-        drone_by_id[drone_id].battery = battery
-        drone_by_id[drone_id].owner = "me"
-        drone_by_id[drone_id].scans = []
-        drone_by_id[drone_id].speed = dpos - old_pos
-
-
-    foe_drone_count = int(input())
-    for _ in range(foe_drone_count):
-        drone_id, drone_x, drone_y, dead, battery = map(int, input().split())
-        pos = Vector(drone_x, drone_y)
-        drone = Drone(drone_id, pos, dead == '1', battery, [],"foe")        
-        drone_by_id[drone_id] = drone
-        foe_drones.append(drone)
-    
-    drone_scan_count = int(input())
-    for _ in range(drone_scan_count):
-        drone_id, fish_id = map(int, input().split())
-        drone_by_id[drone_id].scans.append(fish_id)
-        if fish_id not in drone_by_id[drone_id].scans and drone_by_id[drone_id].owner == 'foe':
-            foe_new_scans.append([drone_id,fish_id])
 
-    visible_fish_count = int(input())
-    for _ in range(visible_fish_count):
-        status = "Not Set"
-        fish_id, fish_x, fish_y, fish_vx, fish_vy = map(int, input().split())
-        vpos = Vector(fish_x, fish_y)
-        vspeed = Vector(fish_vx, fish_vy)
-        if vspeed.mag()>500:
-            status = "Aggressive"
-        elif vspeed.mag()>0:
-            status = "swimming"
-        else:
-            status = "still"
-        visible_fish[fish_id] = Fish(fish_id,vpos,vpos-vspeed,vpos-vspeed,vpos,vpos,vpos+vspeed,vpos+vspeed,vspeed,vspeed,vspeed,
-                                    shoal[fish_id].color,shoal[fish_id].type,status)
+    t = decoder.read_turn()
+    g.turn_start = decoder.turn_start
+    timer.start_turn()
+    my_score = t.my_score
+    foe_score = t.foe_score
+    my_scans[:] = t.my_scans
+    foe_scans[:] = t.foe_scans
+
+    # the four drones are created once and refreshed in place
+    for owner, rows in (("me", t.my_drones), ("foe", t.foe_drones)):
+        for drone_id, drone_x, drone_y, emergency, battery in rows:
+            drone = drone_by_id[drone_id]
+            #find the old position of the drone if we know it to use to calculate the drone speed
+            old_pos = drone.pos if drone.pos.x >= 0 else Vector(drone_x, drone_y)
+            drone.pos = Vector(drone_x, drone_y)
+            drone.emergency = emergency == 1
+            drone.light = battery < drone.battery  # the light costs 5, a dark turn gives 1 back
+            drone.battery = battery
+            drone.owner = owner
+            drone.speed = drone.pos - old_pos
+            drone.last_scans = set(drone.scans)
+            drone.scans = []
+            if owner == "foe":
+                foe_drones.append(drone)
+
+    for drone_id, fish_id in t.drone_scans:
+        drone = drone_by_id[drone_id]
+        drone.scans.append(fish_id)
+        if fish_id not in drone.last_scans and drone.owner == 'foe':
+            foe_new_scans.append([drone_id,fish_id])
 
     # if we can see thee fish update the pos and speed, if not reset visible to False
-    for f in shoal: 
-        if f in visible_fish:
-            shoal[f].pos=visible_fish[f].pos
-            shoal[f].curr_max_pos = visible_fish[f].pos
-            shoal[f].curr_min_pos = visible_fish[f].pos
-            shoal[f].curr_speed= visible_fish[f].curr_speed
-            shoal[f].visible = True
-        else:
-            #needs to be updated
-            shoal[f].visible = False
-
-    
-    my_radar_blip_count = int(input())
-    for _ in range(my_radar_blip_count):
-        drone_id, fish_id, dir = input().split()
-        drone_id = int(drone_id)
-        fish_id = int(fish_id)
-        my_radar_blips.append(RadarBlip(drone_id,fish_id,dir))
-            
-        
-
-# game initialisation
-
-g=game()
+    shoal.visible[:] = False
+    if t.visible_count:
+        seen = t.visible[:t.visible_count].astype(float)
+        slots = shoal.slots(t.visible[:t.visible_count, 0].tolist())
+        vpos = seen[:, 1:3]
+        vspeed = seen[:, 3:5]
+        mag = np.hypot(vspeed[:, 0], vspeed[:, 1])
+        shoal.pos[slots] = vpos
+        shoal.curr_min[slots] = vpos
+        shoal.curr_max[slots] = vpos
+        shoal.curr_speed[slots] = vspeed
+        shoal.status[slots] = np.where(mag > 500, AGGRESSIVE, np.where(mag > 0, SWIMMING, STILL))
+        shoal.visible[slots] = True
+        for fish_id in t.visible[:t.visible_count, 0].tolist():
+            visible_fish[fish_id] = shoal[fish_id]
+
+    my_radar_blips[:] = t.radar[:t.radar_count]
+
+    log.turn = g.turn
+    log.trace(TRACE_SCORE, my_score, foe_score, len(my_scans), len(foe_scans))
+    for row in t.visible[:t.visible_count].tolist():
+        if shoal[row[0]].type == -1:
+            log.trace(TRACE_MONSTER, *row)
 
-closest_test()
 
-initialise_game()
+@dataclass
+class DronePlan:
+    drone_id: int
+    move: Vector  # None means WAIT
+    light: int
+    goal: Vector
+    message: str
 
-# game loop
 
-while True:
-    g.turn += 1  # Incrémente le compteur de tours à chaque itération de la boucle
-    initialise_loop()  # Initialise les variables pour ce tour de jeu
-    
-    # Met à jour les informations de position actuelle en fonction des radars et des informations connues/estimées
-    update_fish()
-    
-    # Prévoit la position des poissons, des drones et des monstres à la fin du tour
-    end_of_turn_positions(shoal)
-    
-    # Crée une liste de cibles
-    new_targets()
-
-    # Pour chaque drone, trouve la meilleure cible ou la surface
-    # Vérifie s'il y a un monstre en route
-    # Affiche l'état du jeu
-    show_game_state()
-    
+# the one-shot greedy choice, written drone by drone into plan so a later failure keeps earlier drones
+def greedy_plan(plan: Dict[int, DronePlan]) -> None:
     planned_path = Vector(0,0)  # Initialise le chemin planifié à (0,0)
-    speed = 600  # Initialise la vitesse des drones à 600
-    holding_scans = []  # Initialise la liste des balayages de drones à une liste vide
-    
-    # Parcours tous les drones pour récupérer leurs balayages
-    for drone in drone_by_id:
-        if drone_by_id[drone].owner == "me":
-            for s in drone_by_id[drone].scans:
-                holding_scans.append(s)
-    
-    # Calcul du score double de surface
-    double_surface_score = score_for_scan(holding_scans) + my_score
+
+    # Les drones se partagent les poissons en une seule affectation conjointe, chaque case valant la meilleure
+    # tournée qui commence par ce poisson avant de remonter ; la surface est choisie quand elle rapporte plus par tour
+    assignment = assign_targets([drone_by_id[d] for d in drone_by_id if drone_by_id[d].owner == "me"])
 
     # Parcours tous les drones
     for drone in drone_by_id:
         if drone_by_id[drone].owner == "me":
-            max_value = -1000000  # Initialise la valeur maximale à une valeur très basse
             target_vector = Vector(0,0)  # Initialise le vecteur cible à (0,0)
             target_fish = -1  # Initialise l'identifiant de poisson cible à -1
             light = 0  # Initialise l'état de la lumière à 0
+            goal = drone_by_id[drone].pos  # Point visé au-delà de ce tour
             
-            # Critères pour aller en surface
-            if len(targets) < 5 or len(drone_by_id[drone].scans) >= 2 or len(targets) == 1:  # Si moins de 5 cibles restantes ou si le drone a scanné au moins 2 poissons ou s'il ne reste qu'un seul poisson
+            if assignment.get(drone) == SURFACE:
                 target_vector = Vector(drone_by_id[drone].pos.x, 500) - drone_by_id[drone].pos
+                goal = Vector(drone_by_id[drone].pos.x, 500)
                 drone_by_id[drone].status = "surface drop off"  # Change le statut du drone en "surface drop off"
             else:
-                for t in targets:
-                    target_value = 0
-                    if t.status != "owned":
-                        if t.target_id not in my_scans:
-                            if t.target_id not in drone_by_id[drone].scans:
-                                # Distance jusqu'à la cible
-                                targetd = dist(drone_by_id[drone].pos, shoal[t.target_id].next_pos())
-                                target_value -= targetd
-                                if target_value > max_value:
-                                    max_value = target_value
-                                    target_fish = t.target_id
-                                    target_vector = shoal[t.target_id].next_pos() - drone_by_id[drone].pos
-                                    t.status = 'owned'
+                target_fish = assignment.get(drone, -1)
                 if target_fish != -1:
-                    drone_by_id[drone].status = "heading for fish " + str(target_fish) + " at " + str(shoal[target_fish].next_pos()) + " min:" + str(shoal[target_fish].next_min_pos.x) + " max:" + str(shoal[target_fish].next_max_pos.x)
+                    target_vector = shoal[target_fish].next_pos() - drone_by_id[drone].pos
+                    goal = shoal[target_fish].next_pos()
+                    for t in targets:
+                        if t.target_id == target_fish:
+                            t.status = 'owned'
+                    drone_by_id[drone].status = "heading for fish " + str(target_fish) + " route " + str(drone_by_id[drone].route) + " at " + str(shoal[target_fish].next_pos()) + " min:" + str(shoal[target_fish].next_min_pos.x) + " max:" + str(shoal[target_fish].next_max_pos.x)
             
+            speed = best_speed(drone_by_id[drone])  # Vitesse des drones, 600 au plus
             planned_path = target_vector.unit() * speed  # Calcule le chemin planifié en fonction de la vitesse
             # Vérifie si le chemin cible est intercepté par un monstre
-            
-            light_check = dist(drone_by_id[drone].pos, shoal[closest_target(drone)].curr_pos())     
-            
-            if light_check < 2000:
-                light = 1  # Active la lumière si la vérification est vraie
-            else:
-                light = 0
+            planned_path = escape_path(drone_by_id[drone], planned_path, speed)
             
             planned_target = planned_path + drone_by_id[drone].pos
-            my_max_score = foe_possible_score(foe_scans)
-            foe_max_score = foe_possible_score(my_scans)
-            my_surface_value = surface_value(drone)
-            print(f"Max Score {str(my_max_score)} Surface {str(my_surface_value)}", file=sys.stderr, flush=True)
+            # Lumière : premier tour du meilleur programme allumé/éteint sur les prochains tours
+            light = int(lights.plan(drone_by_id[drone], planned_target)[0]) if not drone_by_id[drone].emergency else 0
+            if log.enabled(DEBUG):
+                my_max_score = foe_possible_score(foe_scans)
+                foe_max_score = foe_possible_score(my_scans)
+                my_surface_value = surface_value(drone)
+                log.debug("Max Score %d Surface %d", my_max_score, my_surface_value)
             
-            print(f"MOVE {int(planned_target.x)} {int(planned_target.y)} {light} {str(drone_by_id[drone].speed)}")  # Affiche le mouvement planifié du drone
+            # Enregistre le mouvement planifié du drone, affiché par emit_plan
+            plan[drone] = DronePlan(drone, planned_target, light, goal, str(drone_by_id[drone].speed))
+
+
+def emit_plan(plan: Dict[int, DronePlan]) -> None:
+    for drone in sorted(drone_by_id):
+        if drone_by_id[drone].owner != "me":
+            continue
+        p = plan.get(drone)
+        if p is None or p.move is None:
+            print(f"WAIT {p.light if p else 0}")
+        else:
+            print(f"MOVE {int(p.move.x)} {int(p.move.y)} {p.light} {p.message}")
+        pos = drone_by_id[drone].pos
+        target = p.move if p is not None and p.move is not None else pos
+        log.trace(TRACE_PLAN, drone, pos.x, pos.y, target.x, target.y, p.light if p else 0,
+                  drone_by_id[drone].battery, drone_by_id[drone].emergency)
+    sys.stdout.flush()
+
+
+# time allowed per turn by the referee, a safety margin is kept for printing and process noise
+TURN_BUDGET = int(os.environ.get("MYIA_BUDGET_MS", "50"))/1000
+FIRST_TURN_BUDGET = int(os.environ.get("MYIA_FIRST_BUDGET_MS", "1000"))/1000
+SAFETY_MARGIN = 0.012
+
+
+def turn_deadline() -> float:
+    budget = FIRST_TURN_BUDGET if g.turn == 1 else TURN_BUDGET
+    return g.turn_start + budget - SAFETY_MARGIN
+
+
+class PlanTimeout(Exception):
+    pass
+
+
+def _plan_alarm(signum, frame):
+    raise PlanTimeout()
+
+
+class Watchdog:
+    # raises PlanTimeout in the middle of whatever is running once the deadline is reached
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+
+    def __enter__(self):
+        if hasattr(signal, "SIGALRM"):
+            signal.signal(signal.SIGALRM, _plan_alarm)
+            signal.setitimer(signal.ITIMER_REAL, max(self.deadline - time.perf_counter(), 0.001))
+        return self
+
+    def __exit__(self, *exc):
+        if hasattr(signal, "SIGALRM"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        return False
+
+
+class Planner:
+    # anytime search: starts from the greedy plan and looks deeper over candidate headings until the deadline
+    # best always holds a complete, valid plan so it can be printed whenever the search is cut short
+    candidate_headings = np.vstack([np.zeros((1, 2)), HEADINGS[::4]])  # row 0 is replaced by the greedy heading
+    max_sequences = 40000
+    max_depth = int(os.environ.get("MYIA_PLAN_DEPTH", "6"))  # fix it to record games that replay exactly
+
+    def __init__(self):
+        self.best: Dict[int, DronePlan] = {}
+        self.depth_reached = 0
+
+    def reset(self) -> None:
+        self.best = {d: DronePlan(d, None, 0, drone_by_id[d].pos, "fallback") for d in drone_by_id if drone_by_id[d].owner == "me"}
+        self.depth_reached = 0
+
+    def refine(self, deadline: float) -> None:
+        greedy = dict(self.best)
+        # fish the particle tracker has pinned down, about a 2000 wide box (a flat 2000 spread has a deviation of 577)
+        fish = np.flatnonzero((shoal.type != -1) & (shoal.spread.max(axis=1) < 600))
+        values = np.array([score_book.fish_points(int(f)) for f in shoal.ids[fish]], dtype=float)
+        fish = fish[values > 0]
+        values = values[values > 0]
+        headings = self.candidate_headings.copy()
+        for depth in range(1, self.max_depth+1):
+            if len(headings)**depth > self.max_sequences:
+                break
+            for d, plan in greedy.items():
+                drone = drone_by_id[d]
+                if plan.move is None or drone.emergency or time.perf_counter() > deadline:
+                    continue
+                headings[0] = (plan.move - drone.pos).unit().x, (plan.move - drone.pos).unit().y
+                value = self.rollouts(drone, plan, headings, depth, fish, values)
+                best = int(np.argmax(value))
+                first = best // len(headings)**(depth-1)
+                greedy_value = value[:len(headings)**(depth-1)].max()
+                if first != 0 and value[best] > greedy_value + 0.01:
+                    move = drone.pos + Vector(float(headings[first, 0]), float(headings[first, 1]))*600
+                    self.best[d] = DronePlan(d, move, plan.light, plan.goal, f"depth {depth}")
+                else:
+                    self.best[d] = plan
+            self.depth_reached = depth
+
+    # value of every heading sequence of the given depth, in itertools.product order
+    def rollouts(self, drone: Drone, plan: DronePlan, headings: np.ndarray, depth: int, fish: np.ndarray,
+                 values: np.ndarray) -> np.ndarray:
+        seq = np.array(list(itertools.product(range(len(headings)), repeat=depth)))
+        path = np.clip(np.array([drone.pos.x, drone.pos.y]) + np.cumsum(headings[seq]*600, axis=1), 0, 9999)
+        steps = np.arange(1, depth+1, dtype=float)
+        discount = 0.9**(steps-1)
+        radius = np.full(depth, 800.0)
+        radius[0] = 2000 if plan.light else 800
+        value = np.zeros(len(seq))
+
+        if len(fish):
+            fish_at = np.clip(shoal.mean[fish] + shoal.drift[fish]*steps[:, None, None], shoal.low[fish], shoal.high[fish])
+            gap = path[:, :, None, :] - fish_at[None, :, :, :]
+            caught = (gap[..., 0]**2 + gap[..., 1]**2) <= (radius**2)[None, :, None]
+            first = np.argmax(caught, axis=1)
+            value += (caught.any(axis=1)*values[None, :]*discount[first]).sum(axis=1)
+
+        surfaced = path[:, :, 1] <= 500
+        value += surfaced.any(axis=1)*score_book.carried_points*discount[np.argmax(surfaced, axis=1)]
+
+        danger = forecast.forecast().clearance(path) < 800
+        value -= danger*(score_book.carried_points + 20)
+        # monsters we only have a rough idea of: the chance of running into one somewhere on the way
+        risk = monster_tracker.risk(path[:, :, 0], path[:, :, 1]).max(axis=1)
+        value -= risk*(score_book.carried_points + 20)
+
+        value -= np.hypot(path[:, -1, 0] - plan.goal.x, path[:, -1, 1] - plan.goal.y)/600*0.5
+        return value
+
+
+# game initialisation
+
+g=game()
+timer = PhaseTimer(os.environ.get("MYIA_TIMING", "0") == "1")
+log = Diagnostics.from_env()
+planner = Planner()
+search = planner  # the anytime search run after the greedy plan, Tools/beam.py swaps in its own
+forecast = MonsterForecast()
+lights = LightScheduler()
+routes = RoutePlanner()
+
+
+def main():
+    initialise_game()
+
+    # game loop
+
+    while True:
+        g.turn += 1  # Incrémente le compteur de tours à chaque itération de la boucle
+        initialise_loop()  # Initialise les variables pour ce tour de jeu
+        timer.lap("initialise_loop")
+
+        # Met à jour le décompte des points avec les scans sauvés et ceux portés par nos drones
+        score_book.update(my_scans, foe_scans, [s for d in drone_by_id.values() if d.owner == "me" for s in d.scans])
+        timer.lap("score_book")
+
+        # Historique des drones adverses : lumière déduite de la batterie, scans vus et manqués
+        foe_observer.update(foe_drones, foe_new_scans, [rb.fish_id for rb in my_radar_blips], foe_scans)
+
+        # Met à jour les informations de position actuelle en fonction des radars et des informations connues/estimées
+        update_fish()
+        timer.lap("update_fish")
+        my_drones = [d for d in drone_by_id.values() if d.owner == "me"]
+        tracker.update(my_drones, my_radar_blips, foe_observer)
+        monster_tracker.update(my_drones, my_radar_blips)
+        timer.lap("tracker")
+
+        # Prévoit la position des poissons, des drones et des monstres à la fin du tour
+        end_of_turn_positions(shoal)
+        timer.lap("end_of_turn_positions")
+
+        # Prévoit le tour où l'adversaire sauvera chaque poisson
+        foe_predictor.update(foe_drones, [rb.fish_id for rb in my_radar_blips], foe_scans)
+        timer.lap("foe_predictor")
+
+        # Crée une liste de cibles
+        new_targets()
+        timer.lap("new_targets")
+
+        # Pour chaque drone, trouve la meilleure cible ou la surface
+        # Vérifie s'il y a un monstre en route
+        # Affiche l'état du jeu
+        show_game_state()
+        timer.lap("show_game_state")
+
+        # Le plan glouton d'abord, puis affinage jusqu'à l'échéance : un coup valide est toujours affiché
+        planner.reset()
+        try:
+            with Watchdog(turn_deadline()):
+                greedy_plan(planner.best)
+                timer.lap("decisions")
+                search.refine(turn_deadline())
+        except PlanTimeout:
+            log.info("planner cut at depth %d", search.depth_reached)
+        except Exception:
+            # a bug, not a timeout: the greedy plan still goes out, the traceback goes to stderr
+            log.error("planner failed:\n%s", traceback.format_exc())
+        timer.lap("planner")
+        emit_plan(planner.best)
+        log.flush()
+        timer.end_turn(g.turn)
+        if g.turn == 200:
+            timer.report()
+
+
+if __name__ == "__main__":
+    main()
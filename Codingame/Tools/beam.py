@@ -0,0 +1,225 @@
+"""
+    Recherche en faisceau pour MyIA.py, gardée hors du bot soumis (limite de 100 000 caractères du site).
+
+    Remplace l'approfondissement du Planner par une recherche sur les actions jointes de nos drones,
+    sur un modèle simplifié du jeu (poissons selon le suivi, monstres selon la prévision), et joue
+    le bot tel quel pour tout le reste : à lancer à la place de MyIA.py, avec l'arbitre ou le tournoi.
+
+    Utilisation :
+        python referee.py beam.py ../Devs/challenger2.py
+        python tournament.py --bots Tools/beam.py MyIA.py --seeds 50
+"""
+
+import sys, os, time, itertools
+import numpy as np
+from typing import List, Dict, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import MyIA as bot
+
+
+class BeamSearch:
+    # joint actions of our drones, each one a heading with the light on or off, or surfacing, expanded a turn
+    # at a time and pruned to the best joint sequences of a small forward model:
+    # fish drift as the tracker says, monsters follow the forecast, scans, battery, emergencies and banked points
+    # every buffer is sized once for width x joint actions, a simulated turn only writes into them
+    headings = bot.Planner.candidate_headings
+    width = 24
+    discount = 0.95
+    carried_weight = 0.6  # a scan still in the drone is only worth part of what it banks
+    max_depth = bot.Planner.max_depth
+
+    def __init__(self):
+        self.depth_reached = 0
+        self.rollouts = 0
+        self.capacity = 0
+        self.drones: List[bot.Drone] = []
+
+    def _allocate(self, count: int, drones: int, fish: int, monsters: int) -> None:
+        # children of a turn, the parents of the next turn and the scratch of the distance checks
+        shape = (count, drones, max(fish, monsters, 1))
+        if self.capacity >= count and self.scratch.shape[1:] == shape[1:]:
+            return
+        self.capacity = count
+        self.parent = np.zeros(count, dtype=np.int64)
+        self.action = np.zeros(count, dtype=np.int64)
+        self.pos = np.zeros((count, drones, 2))
+        self.battery = np.zeros((count, drones))
+        self.carried = np.zeros((count, drones), dtype=np.int64)
+        self.banked = np.zeros(count, dtype=np.int64)
+        self.hit = np.zeros((count, drones), dtype=bool)
+        self.value = np.zeros(count)
+        self.first = np.zeros(count, dtype=np.int64)
+        self.lit = np.zeros((count, drones), dtype=bool)
+        self.reach = np.zeros((count, drones))
+        self.score = np.zeros(count)
+        self.gain = np.zeros(count)
+        self.everything = np.zeros(count, dtype=np.int64)
+        self.before = np.zeros(count, dtype=np.int64)
+        self.after = np.zeros(count, dtype=np.int64)
+        self.bank_work = np.zeros((3, count), dtype=np.int64)
+        self.scratch = np.zeros(shape)
+        self.gap = np.zeros(shape)
+        self.close = np.zeros(shape, dtype=bool)
+
+    def _actions(self, greedy: Dict[int, bot.DronePlan]) -> Tuple[np.ndarray, np.ndarray]:
+        # per drone: every heading dark then lit, then surfacing; heading 0 is the greedy one
+        step, light = [], []
+        for d in self.drones:
+            headings = self.headings.copy()
+            plan = greedy[d.drone_id]
+            if plan.move is not None:
+                unit = (plan.move - d.pos).unit()
+                headings[0] = unit.x, unit.y
+            else:
+                headings[0] = 0, 0
+            step.append(np.vstack([headings, headings, [(0, -1)]])*600)
+            light.append(np.r_[np.zeros(len(headings), dtype=bool), np.ones(len(headings), dtype=bool), False])
+        # joint actions, first drone fastest
+        joint = np.array(list(itertools.product(*[range(len(s)) for s in step[::-1]])))[:, ::-1]
+        steps = np.stack([step[k][joint[:, k]] for k in range(len(self.drones))], axis=1)
+        lights = np.stack([light[k][joint[:, k]] for k in range(len(self.drones))], axis=1)
+        return steps, lights
+
+    def refine(self, deadline: float) -> None:
+        greedy = dict(bot.planner.best)
+        self.drones = [bot.drone_by_id[d] for d, p in greedy.items() if not bot.drone_by_id[d].emergency]
+        if not self.drones:
+            return
+        steps, lights = self._actions(greedy)
+        joint = len(steps)
+        greedy_action = 0 if not greedy[self.drones[0].drone_id].light else len(self.headings)
+        if len(self.drones) > 1:
+            greedy_action += (len(self.headings) if greedy[self.drones[1].drone_id].light else 0)*(2*len(self.headings) + 1)
+
+        fish = np.flatnonzero((bot.shoal.type != -1) & ~np.isin(bot.shoal.ids, [f for f, b in bot.scan_masks.bit.items() if b & bot.score_book.my_saved]))
+        bits = np.array([bot.scan_masks.bit.get(int(f), 0) for f in bot.shoal.ids[fish]], dtype=np.int64)
+        goals = np.array([(greedy[d.drone_id].goal.x, greedy[d.drone_id].goal.y) for d in self.drones], dtype=float)
+        roll = bot.forecast.forecast()
+        self._allocate(self.width*joint, len(self.drones), len(fish), len(roll.slots))
+        mine, foe = bot.score_book.my_saved, bot.score_book.foe_saved
+
+        # the root: one beam holding the drones as they are now
+        count = 1
+        beam_pos = np.array([[(d.pos.x, d.pos.y) for d in self.drones]], dtype=float)
+        beam_battery = np.array([[d.battery for d in self.drones]], dtype=float)
+        beam_carried = np.array([[bot.scan_masks.mask(d.scans) & ~mine for d in self.drones]], dtype=np.int64)
+        beam_banked = np.zeros(1, dtype=np.int64)
+        beam_hit = np.zeros((1, len(self.drones)), dtype=bool)
+        beam_value = np.zeros(1)
+        beam_first = np.zeros(1, dtype=np.int64)
+
+        self.rollouts = 0
+        for depth in range(1, self.max_depth+1):
+            if time.perf_counter() > deadline:
+                break
+            m = count*joint
+            parent, action = self.parent[:m], self.action[:m]
+            parent[:] = np.repeat(np.arange(count), joint)
+            action[:] = np.tile(np.arange(joint), count)
+            pos, battery, carried, banked = self.pos[:m], self.battery[:m], self.carried[:m], self.banked[:m]
+            hit, value, first, lit, reach = self.hit[:m], self.value[:m], self.first[:m], self.lit[:m], self.reach[:m]
+            np.take(beam_pos, parent, axis=0, out=pos)
+            np.take(beam_battery, parent, axis=0, out=battery)
+            np.take(beam_carried, parent, axis=0, out=carried)
+            np.take(beam_banked, parent, out=banked)
+            np.take(beam_hit, parent, axis=0, out=hit)
+            np.take(beam_value, parent, out=value)
+            if depth == 1:
+                first[:] = action
+            else:
+                np.take(beam_first, parent, out=first)
+
+            # move, light and battery: a frozen drone waits, the light needs 5 battery
+            np.take(lights, action, axis=0, out=lit)
+            lit &= battery >= 5
+            lit &= ~hit
+            pos += np.take(steps, action, axis=0)*~hit[..., None]
+            np.clip(pos, 0, 9999, out=pos)
+            battery += np.where(lit, -5, 1)
+            np.minimum(battery, 30, out=battery)
+            np.copyto(reach, np.where(lit, 2000.0, 800.0))
+            weight = self.discount**(depth-1)
+
+            # scans: fish where the tracker expects them after depth turns
+            if len(fish):
+                at = np.clip(bot.shoal.mean[fish] + bot.shoal.drift[fish]*depth, bot.shoal.low[fish], bot.shoal.high[fish])
+                f = len(fish)
+                gap, scratch, close = self.gap[:m, :, :f], self.scratch[:m, :, :f], self.close[:m, :, :f]
+                np.subtract(pos[:, :, None, 0], at[None, None, :, 0], out=gap)
+                np.multiply(gap, gap, out=scratch)
+                np.subtract(pos[:, :, None, 1], at[None, None, :, 1], out=gap)
+                np.multiply(gap, gap, out=gap)
+                scratch += gap
+                np.less_equal(scratch, (reach*reach)[..., None], out=close)
+                close &= ~hit[..., None]
+                carried |= np.dot(close, bits)
+
+            # monsters: within 500 of a forecast region is an emergency, the scans carried are lost
+            if depth <= roll.horizon and len(roll.slots):
+                k = len(roll.slots)
+                gap, scratch, close = self.gap[:m, :, :k], self.scratch[:m, :, :k], self.close[:m, :, :k]
+                centre = roll.centre[depth]
+                np.subtract(pos[:, :, None, 0], centre[None, None, :, 0], out=gap)
+                np.multiply(gap, gap, out=scratch)
+                np.subtract(pos[:, :, None, 1], centre[None, None, :, 1], out=gap)
+                np.multiply(gap, gap, out=gap)
+                scratch += gap
+                np.sqrt(scratch, out=scratch)
+                scratch -= roll.radius[depth][None, None, :]
+                caught = (scratch.min(axis=2) < 500) & ~hit
+                # a light near a monster draws it in
+                value -= weight*((scratch.min(axis=2) < 2000) & lit).sum(axis=1)
+                value -= 5*caught.sum(axis=1)
+                carried[caught] = 0
+                hit |= caught
+            # monsters we only have a rough idea of
+            value -= weight*5*(bot.monster_tracker.risk(pos[..., 0], pos[..., 1])*~hit).sum(axis=1)
+
+            # surfacing banks what the drone carries
+            up = (pos[..., 1] <= 500) & ~hit
+            before, after, work, gain = self.before[:m], self.after[:m], self.bank_work[:, :m], self.gain[:m]
+            bot.scan_masks.bank_points_many(banked, mine, foe, out=before, work=work)
+            banked |= np.bitwise_or.reduce(carried*up, axis=1)
+            carried[up] = 0
+            bot.scan_masks.bank_points_many(banked, mine, foe, out=after, work=work)
+            np.subtract(after, before, out=gain)
+            gain *= weight
+            value += gain
+
+            # keep the best sequences, what is still carried counted in part
+            score, everything = self.score[:m], self.everything[:m]
+            np.bitwise_or.reduce(carried, axis=1, out=everything)
+            everything |= banked
+            np.subtract(bot.scan_masks.bank_points_many(everything, mine, foe, out=before, work=work), after, out=score)
+            score *= self.carried_weight*weight
+            score += value
+            # past the horizon: on the way to the greedy goal, with battery to spare
+            score -= 0.5*(np.hypot(pos[..., 0] - goals[:, 0], pos[..., 1] - goals[:, 1])/600*~hit).sum(axis=1)
+            score += 0.05*battery.sum(axis=1)
+            self.rollouts += m
+            keep = np.argpartition(-score, min(self.width, m)-1)[:self.width] if m > self.width else np.arange(m)
+
+            # the best first action, unless the greedy one does about as well
+            best = keep[np.argmax(score[keep])]
+            greedy_best = score[first == greedy_action].max() if (first == greedy_action).any() else -np.inf
+            if first[best] != greedy_action and score[best] > greedy_best + 0.01:
+                self._adopt(steps[first[best]], lights[first[best]], greedy, depth)
+            else:
+                for d in self.drones:
+                    bot.planner.best[d.drone_id] = greedy[d.drone_id]
+            self.depth_reached = depth
+
+            count = len(keep)
+            beam_pos, beam_battery, beam_carried = pos[keep], battery[keep], carried[keep]
+            beam_banked, beam_hit, beam_value, beam_first = banked[keep], hit[keep], value[keep], first[keep]
+
+    def _adopt(self, step: np.ndarray, light: np.ndarray, greedy: Dict[int, bot.DronePlan], depth: int) -> None:
+        for k, d in enumerate(self.drones):
+            move = bot.Vector(min(max(d.pos.x + float(step[k, 0]), 0), 9999), min(max(d.pos.y + float(step[k, 1]), 0), 9999))
+            bot.planner.best[d.drone_id] = bot.DronePlan(d.drone_id, move, int(light[k] and d.battery >= 5), greedy[d.drone_id].goal, f"beam {depth}")
+
+
+if __name__ == "__main__":
+    bot.search = BeamSearch()
+    bot.main()
@@ -0,0 +1,311 @@
+"""
+    A* hiérarchique sur grille grossière, pour les bots qui veulent une recherche sur grille.
+
+    La carte de 10000x10000 est découpée en cases de 250 à 600 unités. Chaque tour, les zones de danger
+    (cercles autour des monstres) sont rastérisées une fois dans un bitmap d'obstacles. La recherche se fait
+    sur des nœuds entiers (ligne * colonnes + colonne) avec heapq et une heuristique octile, cohérente pour
+    des déplacements dans 8 directions. Seul le premier tronçon du chemin grossier est ensuite affiné sur une
+    grille fine limitée à une fenêtre autour du drone : le coût d'un tour est borné par la taille des deux
+    grilles, quelle que soit la distance à la cible. Si la fenêtre fine n'a pas de chemin vers le tronçon,
+    le drone fait le pas de 600 le plus proche du tronçon parmi ceux qui ne touchent aucun cercle, ou, s'il
+    n'y en a aucun, celui qui s'en écarte le plus.
+
+    Le module n'a pas de dépendance ; un bot qui doit tenir dans un seul fichier peut copier GridPlanner.
+
+    Micro-benchmark contre a_star() de Devs/challenger3.py sur les positions d'une partie enregistrée,
+    complétées par des positions tirées au hasard avec 2 à 6 monstres entre le drone et sa cible :
+        python referee.py ../MyIA.py ../Devs/challenger2.py --transcript /tmp/game
+        python gridpath.py --bench /tmp/game.p0
+"""
+
+import sys, os, ast, math, heapq, time, random
+from typing import List, Dict, Tuple, Optional
+
+MAP_SIZE = 10000
+DRONE_STEP = 600
+SQRT2 = math.sqrt(2)
+# the 8 moves as (column step, row step, cost in cells)
+MOVES = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+         (1, 1, SQRT2), (1, -1, SQRT2), (-1, 1, SQRT2), (-1, -1, SQRT2)]
+HEADINGS = [(math.cos(math.pi * k / 8), math.sin(math.pi * k / 8)) for k in range(16)]
+
+
+def rasterize(circles: List[Tuple[float, float, float]], x0: float, y0: float, cell: float, cols: int, rows: int) -> bytearray:
+    """Bitmap (1 = bloquée) des cases d'une grille dont une partie tombe dans un des cercles (x, y, rayon)."""
+    blocked = bytearray(cols * rows)
+    for cx, cy, radius in circles:
+        c0 = max(int((cx - radius - x0) // cell), 0)
+        c1 = min(int((cx + radius - x0) // cell), cols - 1)
+        r0 = max(int((cy - radius - y0) // cell), 0)
+        r1 = min(int((cy + radius - y0) // cell), rows - 1)
+        r2 = radius * radius
+        for r in range(r0, r1 + 1):
+            top = y0 + r * cell
+            dy = max(top - cy, 0, cy - top - cell)
+            for c in range(c0, c1 + 1):
+                left = x0 + c * cell
+                dx = max(left - cx, 0, cx - left - cell)
+                if dx * dx + dy * dy < r2:
+                    blocked[r * cols + c] = 1
+    return blocked
+
+
+def clearance(sx: float, sy: float, ex: float, ey: float, circles: List[Tuple[float, float, float]]) -> float:
+    """Plus petite marge (distance moins rayon) entre le segment (sx, sy) -> (ex, ey) et les cercles."""
+    dx, dy = ex - sx, ey - sy
+    dd = dx * dx + dy * dy
+    margin = math.inf
+    for cx, cy, radius in circles:
+        t = 0.0 if dd == 0 else min(1.0, max(0.0, ((cx - sx) * dx + (cy - sy) * dy) / dd))
+        margin = min(margin, math.hypot(sx + dx * t - cx, sy + dy * t - cy) - radius)
+    return margin
+
+
+def search(blocked: bytearray, cols: int, rows: int, start: int, goal: int, max_nodes: int = 1 << 30) -> List[int]:
+    """A* 8-connexe sur une grille de nœuds entiers ; retourne les nœuds de start (exclu) à goal, [] sinon.
+
+    La case de départ et la case d'arrivée sont toujours praticables. L'heuristique octile ne surestime
+    jamais et respecte l'inégalité triangulaire, donc un nœud sorti de la file n'est jamais rouvert.
+    """
+    gc, gr = goal % cols, goal // cols
+
+    def octile(node: int) -> float:
+        dc, dr = abs(node % cols - gc), abs(node // cols - gr)
+        return max(dc, dr) + (SQRT2 - 1) * min(dc, dr)
+
+    cost = {start: 0.0}
+    parent = {start: -1}
+    open_set = [(octile(start), start)]
+    closed = set()
+    while open_set and len(closed) < max_nodes:
+        _, node = heapq.heappop(open_set)
+        if node == goal:
+            path = []
+            while node != start:
+                path.append(node)
+                node = parent[node]
+            path.reverse()
+            return path
+        if node in closed:
+            continue
+        closed.add(node)
+        c, r = node % cols, node // cols
+        g = cost[node]
+        for dc, dr, step in MOVES:
+            nc, nr = c + dc, r + dr
+            if not (0 <= nc < cols and 0 <= nr < rows):
+                continue
+            nxt = nr * cols + nc
+            if blocked[nxt] and nxt != goal:
+                continue
+            # no corner cutting between two blocked cells
+            if dc and dr and blocked[r * cols + nc] and blocked[nr * cols + c]:
+                continue
+            new_cost = g + step
+            if new_cost < cost.get(nxt, math.inf):
+                cost[nxt] = new_cost
+                parent[nxt] = node
+                heapq.heappush(open_set, (new_cost + octile(nxt), nxt))
+    return []
+
+
+class GridPlanner:
+    """Grille grossière de toute la carte, bitmap des dangers refait à chaque tour, affinage du premier tronçon."""
+
+    def __init__(self, cell: int = 500, fine_cell: int = 100, window: int = 1500):
+        assert 250 <= cell <= 600
+        self.cell = cell
+        self.cols = (MAP_SIZE + cell - 1) // cell
+        self.fine_cell = fine_cell
+        self.window = window  # half width of the fine grid around the drone
+        self.circles: List[Tuple[float, float, float]] = []
+        self.blocked = bytearray(self.cols * self.cols)
+
+    def set_dangers(self, circles: List[Tuple[float, float, float]]) -> None:
+        """Zones de danger du tour : cercles (x, y, rayon)."""
+        self.circles = circles
+        self.blocked = rasterize(circles, 0, 0, self.cell, self.cols, self.cols)
+
+    def _node(self, x: float, y: float) -> int:
+        c = min(max(int(x) // self.cell, 0), self.cols - 1)
+        r = min(max(int(y) // self.cell, 0), self.cols - 1)
+        return r * self.cols + c
+
+    def _centre(self, node: int) -> Tuple[float, float]:
+        return (node % self.cols + 0.5) * self.cell, (node // self.cols + 0.5) * self.cell
+
+    def coarse_path(self, start: Tuple[float, float], goal: Tuple[float, float]) -> List[Tuple[float, float]]:
+        nodes = search(self.blocked, self.cols, self.cols, self._node(*start), self._node(*goal))
+        return [self._centre(n) for n in nodes[:-1]] + [goal] if nodes else []
+
+    def next_waypoint(self, start: Tuple[float, float], goal: Tuple[float, float]) -> Optional[Tuple[int, int]]:
+        """Point à viser ce tour (à au plus 600 du drone), None si aucun chemin sûr n'existe."""
+        sx, sy = start
+        path = self.coarse_path(start, goal)
+        if not path:
+            return None
+        # first leg: the furthest coarse waypoint still inside the fine window
+        leg = path[0]
+        for point in path:
+            if abs(point[0] - sx) > self.window or abs(point[1] - sy) > self.window:
+                break
+            leg = point
+
+        # refine it on a fine grid centred on the drone
+        x0, y0 = sx - self.window, sy - self.window
+        size = 2 * self.window // self.fine_cell
+        near = [c for c in self.circles if abs(c[0] - sx) < self.window + c[2] and abs(c[1] - sy) < self.window + c[2]]
+        blocked = rasterize(near, x0, y0, self.fine_cell, size, size)
+        # outside the map is blocked too
+        inside = [0 <= x0 + (i + 0.5) * self.fine_cell < MAP_SIZE for i in range(size)]
+        inside_rows = [0 <= y0 + (i + 0.5) * self.fine_cell < MAP_SIZE for i in range(size)]
+        if not all(inside) or not all(inside_rows):
+            for r in range(size):
+                for c in range(size):
+                    if not (inside[c] and inside_rows[r]):
+                        blocked[r * size + c] = 1
+
+        def fine_node(x: float, y: float) -> int:
+            c = min(max(int((x - x0) // self.fine_cell), 0), size - 1)
+            r = min(max(int((y - y0) // self.fine_cell), 0), size - 1)
+            return r * size + c
+
+        fine = search(blocked, size, size, fine_node(sx, sy), fine_node(*leg))
+        if not fine:
+            # the fine window is walled in: the full step closest to the leg that touches no circle,
+            # the one keeping furthest from them when every step does
+            steps = [(min(max(sx + hx * DRONE_STEP, 0), MAP_SIZE - 1), min(max(sy + hy * DRONE_STEP, 0), MAP_SIZE - 1))
+                     for hx, hy in HEADINGS]
+            safe = [p for p in steps if clearance(sx, sy, p[0], p[1], near) >= 0]
+            if safe:
+                target = min(safe, key=lambda p: math.hypot(leg[0] - p[0], leg[1] - p[1]))
+            else:
+                target = max(steps, key=lambda p: clearance(sx, sy, p[0], p[1], near))
+        else:
+            # walk the fine path up to one drone step
+            target = (sx, sy)
+            for node in fine:
+                x, y = x0 + (node % size + 0.5) * self.fine_cell, y0 + (node // size + 0.5) * self.fine_cell
+                if math.hypot(x - sx, y - sy) > DRONE_STEP:
+                    break
+                target = (x, y)
+            if fine[-1] == fine_node(*leg) and math.hypot(leg[0] - sx, leg[1] - sy) <= DRONE_STEP:
+                target = leg
+        return int(target[0]), int(target[1])
+
+
+# -- micro-benchmark ----------------------------------------------------------
+
+def recorded_positions(transcript: str):
+    """(drone position, goal, monsters as (x, y, vx, vy)) for each of our drones on each recorded turn."""
+    from replay import read_transcript
+    _, turns = read_transcript(transcript)
+    tokens = b"".join(inp for inp, _ in turns).split()
+    at = 0
+
+    def take(count: int) -> List[int]:
+        nonlocal at
+        values = [int(t) if t.lstrip(b"-").isdigit() else t for t in tokens[at:at + count]]
+        at += count
+        return values
+
+    def rows(width: int) -> List[List[int]]:
+        count = take(1)[0]
+        values = take(count * width)
+        return [values[i:i + width] for i in range(0, len(values), width)]
+
+    types = {c[0]: c[2] for c in rows(3)}
+    for _ in turns:
+        take(2)
+        take(take(1)[0])
+        take(take(1)[0])
+        mine = rows(5)
+        rows(5)
+        rows(2)
+        visible = rows(5)
+        rows(3)
+        monsters = [(x, y, vx, vy) for f, x, y, vx, vy in visible if types.get(f) == -1]
+        fish = [(x, y) for f, x, y, _, _ in visible if types.get(f) != -1]
+        for _, x, y, _, _ in mine:
+            goal = min(fish, key=lambda p: (p[0] - x) ** 2 + (p[1] - y) ** 2) if fish else (x, 9000)
+            yield (x, y), goal, monsters
+
+
+def crowded_positions(cases, counts=(2, 3, 4, 6), seed: int = 0):
+    """Les positions enregistrées reprises avec count monstres tirés au hasard autour du trajet vers la cible."""
+    rng = random.Random(seed)
+    for (x, y), goal, _ in cases:
+        for count in counts:
+            monsters = []
+            while len(monsters) < count:
+                t = rng.random()
+                mx = x + (goal[0] - x) * t + rng.uniform(-1500, 1500)
+                my = y + (goal[1] - y) * t + rng.uniform(-1500, 1500)
+                # not already on the drone: that one would be an emergency, not a path to find
+                if 0 <= mx < MAP_SIZE and 2500 <= my < MAP_SIZE and math.hypot(mx - x, my - y) > 1000:
+                    heading, speed = rng.uniform(0, 2 * math.pi), rng.choice((0, 270, 540))
+                    monsters.append((int(mx), int(my), int(speed * math.cos(heading)), int(speed * math.sin(heading))))
+            yield (x, y), goal, monsters
+
+
+# what a_star() of Devs/challenger3.py needs, by name
+A_STAR_NAMES = {"Vector", "FishDetail", "Fish", "Drone", "DRONE_STEP", "DANGER_RADIUS", "DANGER_GROWTH",
+                "NODE_CELL", "HEADINGS", "clearance", "a_star"}
+
+
+def load_a_star(path: str, names=A_STAR_NAMES) -> dict:
+    """Espace de noms des imports du bot et de ses seules définitions names, sans lancer sa boucle de jeu."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    keep = [node for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))
+            or isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in names
+            or isinstance(node, ast.Assign) and all(isinstance(t, ast.Name) and t.id in names for t in node.targets)]
+    scope = {"__name__": "bot"}
+    exec(compile(ast.Module(body=keep, type_ignores=[]), path, "exec"), scope)
+    missing = names - scope.keys()
+    if missing:
+        raise SystemExit("%s : %s introuvable" % (path, ", ".join(sorted(missing))))
+    return scope
+
+
+def bench(transcript: str, bot: str, cell: int) -> None:
+    scope = load_a_star(bot)
+    Vector, Fish, FishDetail, Drone = scope["Vector"], scope["Fish"], scope["FishDetail"], scope["Drone"]
+    planner = GridPlanner(cell)
+    times: Dict[Tuple[str, int], List[float]] = {}  # (planner, monsters in sight) -> seconds
+    cases = list(recorded_positions(transcript))
+    recorded = len(cases)
+    cases += list(crowded_positions(cases))
+    for (x, y), goal, monsters in cases:
+        start = time.perf_counter()
+        planner.set_dangers([(mx + vx, my + vy, 800) for mx, my, vx, vy in monsters])
+        planner.next_waypoint((x, y), goal)
+        times.setdefault(("gridpath", len(monsters)), []).append(time.perf_counter() - start)
+
+        visible = [Fish(-1, Vector(mx, my), Vector(vx, vy), FishDetail(-1, -1)) for mx, my, vx, vy in monsters]
+        start = time.perf_counter()
+        scope["a_star"](Drone(0, Vector(x, y), False, 30, []), Fish(0, Vector(*goal), Vector(0, 0), FishDetail(0, 0)), visible, MAP_SIZE)
+        times.setdefault(("a_star", len(monsters)), []).append(time.perf_counter() - start)
+
+    print("%d recorded drone positions, %d with monsters in sight, %d drawn with several monsters" % (
+        recorded, sum(1 for c in cases[:recorded] if c[2]), len(cases) - recorded))
+    for (name, count), values in sorted(times.items()):
+        values.sort()
+        print("%-9s %d monsters %5d cases  p50 %6.2f ms  p95 %6.2f ms  max %6.2f ms" % (
+            name, count, len(values), 1000 * values[len(values) // 2], 1000 * values[int(len(values) * 0.95)], 1000 * values[-1]))
+
+
+def main(argv: List[str]):
+    import argparse
+    parser = argparse.ArgumentParser(description="A* hiérarchique sur grille grossière")
+    parser.add_argument("--bench", metavar="TRANSCRIPT", required=True, help="partie enregistrée (referee.py --transcript)")
+    parser.add_argument("--bot", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Devs", "challenger3.py"),
+                        help="bot dont on compare a_star()")
+    parser.add_argument("--cell", type=int, default=500, help="taille des cases de la grille grossière (250-600)")
+    args = parser.parse_args(argv)
+    bench(args.bench, args.bot, args.cell)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
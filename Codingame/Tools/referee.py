@@ -0,0 +1,664 @@
+"""
+    Arbitre local de Seabed Security.
+
+    Ce module reproduit hors ligne les règles du jeu (déplacement des poissons, des monstres et des drones,
+    lumière et batterie, scans, urgences et remontées à la surface) afin de pouvoir évaluer MyIA.py et les
+    bots de Devs/ sans passer par le site.
+
+    Le moteur (classe Game) est déterministe pour une graine donnée. Il produit exactement le bloc
+    d'initialisation lu par initialise_game() et le bloc de tour lu par initialise_loop(), et accepte
+    les lignes "MOVE x y light" / "WAIT light" affichées par les bots.
+
+    Utilisation :
+        python referee.py MyIA.py Devs/challenger2.py --seed 3     # une partie entre deux bots
+        python referee.py --bench 1000                           # débit du moteur seul
+"""
+
+import sys, math, os, time, random, select, subprocess, gzip, struct
+from typing import List, Dict, Callable, Optional
+
+MAP_SIZE = 10000
+MAX_TURNS = 200
+SURFACE_Y = 500
+
+DRONE_SPEED = 600
+DRONE_SINK = 300
+DRONE_EMERGENCY_SPEED = 300
+DARK_RADIUS = 800
+LIGHT_RADIUS = 2000
+LIGHT_COST = 5
+MAX_BATTERY = 30
+
+FISH_SPEED = 200
+FISH_FLEE_SPEED = 400
+FISH_FLEE_RADIUS = 1400
+CREATURE_AVOID_RADIUS = 600
+
+MONSTER_SPEED = 270
+MONSTER_CHASE_SPEED = 540
+MONSTER_VISIBLE_BONUS = 300
+MONSTER_HABITAT = (2500, MAP_SIZE)
+EMERGENCY_RADIUS = 500
+
+# habitat (min y, max y) for each fish type
+HABITATS = [(2500, 5000), (5000, 7500), (7500, 10000)]
+FISH_COLORS = 4
+FISH_TYPES = 3
+FIRST_CREATURE_ID = 4
+
+DRONE_START_X = [3333, 6666]
+
+
+class Drone:
+    def __init__(self, drone_id: int, owner: int, x: float, y: float):
+        self.drone_id = drone_id
+        self.owner = owner
+        self.x = x
+        self.y = y
+        self.battery = MAX_BATTERY
+        self.emergency = False
+        self.light = False
+        self.scans = 0          # bitmask of creature indexes carried but not saved
+        self.tx = x             # target of the current turn
+        self.ty = y
+        self.wait = True
+
+
+class Game:
+    """Etat complet d'une partie. Les créatures sont stockées en listes parallèles indexées de 0 à n-1."""
+
+    def __init__(self, seed: int = 0, monster_pairs: Optional[int] = None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.turn = 0
+        self.over = False
+        self.scores = [0, 0]
+        self.saved = [0, 0]                 # bitmask of saved creatures per player
+        self.type_done = [[False] * FISH_TYPES, [False] * FISH_TYPES]
+        self.color_done = [[False] * FISH_COLORS, [False] * FISH_COLORS]
+        self.deactivated = [False, False]
+
+        # creatures
+        self.ids: List[int] = []
+        self.color: List[int] = []
+        self.type: List[int] = []
+        self.x: List[float] = []
+        self.y: List[float] = []
+        self.vx: List[float] = []
+        self.vy: List[float] = []
+        self.alive: List[bool] = []
+        self.target: List[int] = []         # monster chase target (drone index or -1)
+        self._spawn(monster_pairs)
+        self.fish = [i for i in range(len(self.ids)) if self.type[i] != -1]
+        self.monsters = [i for i in range(len(self.ids)) if self.type[i] == -1]
+        self.fish_mask = 0
+        for i in self.fish:
+            self.fish_mask |= 1 << i
+
+        self.drones = [Drone(0, 0, DRONE_START_X[0], SURFACE_Y), Drone(1, 1, DRONE_START_X[1], SURFACE_Y),
+                       Drone(2, 0, DRONE_START_X[1], SURFACE_Y), Drone(3, 1, DRONE_START_X[0], SURFACE_Y)]
+
+    # -- setup ---------------------------------------------------------------
+
+    def _add_creature(self, color: int, _type: int, x: float, y: float, vx: float, vy: float):
+        self.ids.append(FIRST_CREATURE_ID + len(self.ids))
+        self.color.append(color)
+        self.type.append(_type)
+        self.x.append(x)
+        self.y.append(y)
+        self.vx.append(vx)
+        self.vy.append(vy)
+        self.alive.append(True)
+        self.target.append(-1)
+
+    def _spawn(self, monster_pairs: Optional[int]):
+        rng = self.rng
+        # fish are placed in mirrored pairs so both sides of the map are worth the same
+        for _type in range(FISH_TYPES):
+            low, high = HABITATS[_type]
+            for color in range(0, FISH_COLORS, 2):
+                x = rng.randint(1000, 4000)
+                y = rng.randint(low + 500, high - 500)
+                angle = rng.random() * 2 * math.pi
+                vx = round(math.cos(angle) * FISH_SPEED)
+                vy = round(math.sin(angle) * FISH_SPEED)
+                self._add_creature(color, _type, x, y, vx, vy)
+                self._add_creature(color + 1, _type, MAP_SIZE - 1 - x, y, -vx, vy)
+        if monster_pairs is None:
+            monster_pairs = rng.randint(1, 3)
+        for _ in range(monster_pairs):
+            x = rng.randint(1000, 4000)
+            y = rng.randint(5000, 9500)
+            angle = rng.random() * 2 * math.pi
+            vx = round(math.cos(angle) * MONSTER_SPEED)
+            vy = round(math.sin(angle) * MONSTER_SPEED)
+            self._add_creature(-1, -1, x, y, vx, vy)
+            self._add_creature(-1, -1, MAP_SIZE - 1 - x, y, -vx, vy)
+
+    # -- protocol ------------------------------------------------------------
+
+    def init_block(self) -> str:
+        """Bloc lu une seule fois par initialise_game()."""
+        lines = [str(len(self.ids))]
+        for i in range(len(self.ids)):
+            lines.append("%d %d %d" % (self.ids[i], self.color[i], self.type[i]))
+        return "\n".join(lines) + "\n"
+
+    def _saved_ids(self, player: int) -> List[int]:
+        mask = self.saved[player]
+        return [self.ids[i] for i in range(len(self.ids)) if mask >> i & 1]
+
+    def turn_block(self, player: int) -> str:
+        """Bloc lu à chaque tour par initialise_loop(), du point de vue de player."""
+        foe = 1 - player
+        lines = [str(self.scores[player]), str(self.scores[foe])]
+        for p in (player, foe):
+            saved = self._saved_ids(p)
+            lines.append(str(len(saved)))
+            lines.extend(str(s) for s in saved)
+        my_drones = [d for d in self.drones if d.owner == player]
+        foe_drones = [d for d in self.drones if d.owner == foe]
+        for group in (my_drones, foe_drones):
+            lines.append(str(len(group)))
+            for d in group:
+                lines.append("%d %d %d %d %d" % (d.drone_id, d.x, d.y, 1 if d.emergency else 0, d.battery))
+        scan_lines = []
+        for d in my_drones + foe_drones:
+            for i in range(len(self.ids)):
+                if d.scans >> i & 1:
+                    scan_lines.append("%d %d" % (d.drone_id, self.ids[i]))
+        lines.append(str(len(scan_lines)))
+        lines.extend(scan_lines)
+
+        visible = []
+        for i in range(len(self.ids)):
+            if not self.alive[i]:
+                continue
+            bonus = MONSTER_VISIBLE_BONUS if self.type[i] == -1 else 0
+            for d in my_drones:
+                radius = (LIGHT_RADIUS if d.light else DARK_RADIUS) + bonus
+                dx = self.x[i] - d.x
+                dy = self.y[i] - d.y
+                if dx * dx + dy * dy <= radius * radius:
+                    visible.append("%d %d %d %d %d" % (self.ids[i], self.x[i], self.y[i], self.vx[i], self.vy[i]))
+                    break
+        lines.append(str(len(visible)))
+        lines.extend(visible)
+
+        radar = []
+        for d in my_drones:
+            for i in range(len(self.ids)):
+                if self.alive[i]:
+                    radar.append("%d %d %s%s" % (d.drone_id, self.ids[i],
+                                                 "T" if self.y[i] < d.y else "B",
+                                                 "L" if self.x[i] < d.x else "R"))
+        lines.append(str(len(radar)))
+        lines.extend(radar)
+        return "\n".join(lines) + "\n"
+
+    def set_actions(self, player: int, actions: List[str]) -> bool:
+        """Applique les lignes d'un joueur. Retourne False si une ligne est invalide."""
+        my_drones = [d for d in self.drones if d.owner == player]
+        if len(actions) < len(my_drones):
+            return False
+        for d, line in zip(my_drones, actions):
+            parts = line.split()
+            try:
+                if parts[0] == "MOVE":
+                    d.tx, d.ty, d.wait = int(parts[1]), int(parts[2]), False
+                    light = int(parts[3])
+                elif parts[0] == "WAIT":
+                    d.wait = True
+                    light = int(parts[1])
+                else:
+                    return False
+            except (IndexError, ValueError):
+                return False
+            d.light = light == 1 and d.battery >= LIGHT_COST and not d.emergency
+        return True
+
+    def deactivate(self, player: int):
+        # a crashed or timed out player loses, as on the website
+        self.deactivated[player] = True
+        self.scores[player] = -1
+        self.over = True
+
+    # -- turn resolution -----------------------------------------------------
+
+    def step(self):
+        """Résout un tour complet une fois les actions des deux joueurs données."""
+        if self.over:
+            return
+        self.turn += 1
+        drones = self.drones
+        start = [(d.x, d.y) for d in drones]
+
+        # drones
+        for d in drones:
+            if d.emergency:
+                d.light = False
+                d.y = max(0, d.y - DRONE_EMERGENCY_SPEED)
+            elif d.wait:
+                d.y = min(MAP_SIZE - 1, d.y + DRONE_SINK)
+            else:
+                dx = d.tx - d.x
+                dy = d.ty - d.y
+                length = math.sqrt(dx * dx + dy * dy)
+                if length > DRONE_SPEED:
+                    dx = dx * DRONE_SPEED / length
+                    dy = dy * DRONE_SPEED / length
+                d.x = min(MAP_SIZE - 1, max(0, round(d.x + dx)))
+                d.y = min(MAP_SIZE - 1, max(0, round(d.y + dy)))
+            if d.light:
+                d.battery -= LIGHT_COST
+            else:
+                d.battery = min(MAX_BATTERY, d.battery + 1)
+
+        # emergencies, using the closest approach of each drone and monster during the turn
+        for m in self.monsters:
+            if not self.alive[m]:
+                continue
+            mvx, mvy = self.vx[m], self.vy[m]
+            for k, d in enumerate(drones):
+                if d.emergency:
+                    continue
+                sx, sy = start[k]
+                px = self.x[m] - sx
+                py = self.y[m] - sy
+                rvx = mvx - (d.x - sx)
+                rvy = mvy - (d.y - sy)
+                rv2 = rvx * rvx + rvy * rvy
+                t = 0.0 if rv2 == 0 else min(1.0, max(0.0, -(px * rvx + py * rvy) / rv2))
+                cx = px + rvx * t
+                cy = py + rvy * t
+                if cx * cx + cy * cy <= EMERGENCY_RADIUS * EMERGENCY_RADIUS:
+                    d.emergency = True
+                    d.light = False
+                    d.scans = 0
+
+        # creatures
+        self._move_creatures()
+
+        # scans
+        for d in drones:
+            if d.emergency:
+                continue
+            radius = LIGHT_RADIUS if d.light else DARK_RADIUS
+            r2 = radius * radius
+            owned = self.saved[d.owner] | d.scans
+            for i in self.fish:
+                if self.alive[i] and not owned >> i & 1:
+                    dx = self.x[i] - d.x
+                    dy = self.y[i] - d.y
+                    if dx * dx + dy * dy <= r2:
+                        d.scans |= 1 << i
+
+        # surfacing
+        for d in drones:
+            if d.y <= SURFACE_Y and d.emergency:
+                d.emergency = False
+        new_saves = [0, 0]
+        for d in drones:
+            if d.y <= SURFACE_Y and d.scans:
+                new_saves[d.owner] |= d.scans & ~self.saved[d.owner]
+                d.scans = 0
+        self._bank(new_saves)
+
+        self._update_speeds()
+
+        if self.turn >= MAX_TURNS or not self._points_left():
+            self._finish()
+
+    def _bank(self, new_saves: List[int]):
+        before = list(self.saved)
+        types_before = [list(t) for t in self.type_done]
+        colors_before = [list(c) for c in self.color_done]
+        for p in (0, 1):
+            if not new_saves[p]:
+                continue
+            foe = 1 - p
+            for i in self.fish:
+                if new_saves[p] >> i & 1:
+                    points = self.type[i] + 1
+                    if not before[foe] >> i & 1:
+                        points *= 2
+                    self.scores[p] += points
+            self.saved[p] |= new_saves[p]
+            for _type in range(FISH_TYPES):
+                if not self.type_done[p][_type] and self._has_all(p, lambda i: self.type[i] == _type):
+                    self.type_done[p][_type] = True
+                    self.scores[p] += 4 if types_before[foe][_type] else 8
+            for color in range(FISH_COLORS):
+                if not self.color_done[p][color] and self._has_all(p, lambda i: self.color[i] == color):
+                    self.color_done[p][color] = True
+                    self.scores[p] += 3 if colors_before[foe][color] else 6
+
+    def _has_all(self, player: int, member: Callable[[int], bool]) -> bool:
+        saved = self.saved[player]
+        for i in self.fish:
+            if member(i) and not saved >> i & 1:
+                return False
+        return True
+
+    def _points_left(self) -> bool:
+        for p in (0, 1):
+            reachable = 0
+            for i in self.fish:
+                if self.alive[i]:
+                    reachable |= 1 << i
+            for d in self.drones:
+                if d.owner == p:
+                    reachable |= d.scans
+            if reachable & ~self.saved[p]:
+                return True
+        return False
+
+    def _finish(self):
+        # carried scans are banked at the end of the game
+        new_saves = [0, 0]
+        for d in self.drones:
+            new_saves[d.owner] |= d.scans & ~self.saved[d.owner]
+            d.scans = 0
+        self._bank(new_saves)
+        self.over = True
+
+    def _move_creatures(self):
+        for i in range(len(self.ids)):
+            if not self.alive[i]:
+                continue
+            nx = self.x[i] + self.vx[i]
+            ny = self.y[i] + self.vy[i]
+            if self.type[i] == -1:
+                nx = min(MAP_SIZE - 1, max(0, nx))
+                ny = min(MONSTER_HABITAT[1] - 1, max(MONSTER_HABITAT[0], ny))
+            elif nx < 0 or nx > MAP_SIZE - 1:
+                # fish that swim off the side of the map are lost for good
+                self.alive[i] = False
+            self.x[i] = nx
+            self.y[i] = ny
+
+    def _update_speeds(self):
+        xs, ys = self.x, self.y
+        drones = self.drones
+        n = len(self.ids)
+        for i in range(n):
+            if not self.alive[i]:
+                continue
+            x, y = xs[i], ys[i]
+            if self.type[i] == -1:
+                self._update_monster(i, x, y)
+                continue
+
+            # flee from drones whose motors can be heard
+            fx = fy = 0.0
+            scared = 0
+            for d in drones:
+                if d.emergency:
+                    continue
+                dx = x - d.x
+                dy = y - d.y
+                if dx * dx + dy * dy <= FISH_FLEE_RADIUS * FISH_FLEE_RADIUS:
+                    fx += d.x
+                    fy += d.y
+                    scared += 1
+            if scared:
+                vx, vy = _scaled(x - fx / scared, y - fy / scared, FISH_FLEE_SPEED)
+            else:
+                near = _closest(i, xs, ys, self.alive, self.fish)
+                if near != -1:
+                    vx, vy = _scaled(x - xs[near], y - ys[near], FISH_SPEED)
+                else:
+                    vx, vy = _scaled(self.vx[i], self.vy[i], FISH_SPEED)
+                # fish only leave the map when they are fleeing
+                if not 0 <= x + vx <= MAP_SIZE - 1:
+                    vx = -vx
+            low, high = HABITATS[self.type[i]]
+            if not low <= y + vy <= high:
+                vy = -vy
+            self.vx[i] = round(vx)
+            self.vy[i] = round(vy)
+
+    def _update_monster(self, i: int, x: float, y: float):
+        best = -1
+        best_d2 = 0.0
+        for k, d in enumerate(self.drones):
+            if d.emergency:
+                continue
+            radius = LIGHT_RADIUS if d.light else DARK_RADIUS
+            dx = d.x - x
+            dy = d.y - y
+            d2 = dx * dx + dy * dy
+            if d2 <= radius * radius and (best == -1 or d2 < best_d2):
+                best, best_d2 = k, d2
+        if best != -1:
+            self.target[i] = best
+            vx, vy = _scaled(self.drones[best].x - x, self.drones[best].y - y, MONSTER_CHASE_SPEED)
+        else:
+            near = _closest(i, self.x, self.y, self.alive, self.monsters)
+            if near != -1:
+                vx, vy = _scaled(x - self.x[near], y - self.y[near], MONSTER_SPEED)
+            else:
+                # lost its prey: back to patrol speed in the same direction
+                vx, vy = _scaled(self.vx[i], self.vy[i], MONSTER_SPEED)
+            self.target[i] = -1
+        if not 0 <= x + vx <= MAP_SIZE - 1:
+            vx = -vx
+        if not MONSTER_HABITAT[0] <= y + vy <= MONSTER_HABITAT[1] - 1:
+            vy = -vy
+        self.vx[i] = round(vx)
+        self.vy[i] = round(vy)
+
+    # -- results -------------------------------------------------------------
+
+    def winner(self) -> int:
+        """0 ou 1 pour le vainqueur, -1 en cas d'égalité."""
+        if self.scores[0] == self.scores[1]:
+            return -1
+        return 0 if self.scores[0] > self.scores[1] else 1
+
+
+def _scaled(x: float, y: float, speed: float):
+    length = math.sqrt(x * x + y * y)
+    if length == 0:
+        return 0.0, 0.0
+    return x * speed / length, y * speed / length
+
+
+def _closest(i: int, xs: List[float], ys: List[float], alive: List[bool], group: List[int]) -> int:
+    # index of the closest creature of group within avoiding range of creature i
+    best = -1
+    best_d2 = CREATURE_AVOID_RADIUS * CREATURE_AVOID_RADIUS
+    for j in group:
+        if j == i or not alive[j]:
+            continue
+        dx = xs[j] - xs[i]
+        dy = ys[j] - ys[i]
+        d2 = dx * dx + dy * dy
+        if d2 < best_d2:
+            best, best_d2 = j, d2
+    return best
+
+
+# -- players -----------------------------------------------------------------
+
+class Transcript:
+    """Partie d'un bot pour replay.py : flux gzip d'enregistrements (type sur 1 octet, longueur sur 4 octets,
+    données), S la graine BOT_SEED du bot, I ce que l'arbitre lui a envoyé, O ce qu'il a répondu."""
+
+    def __init__(self, path: str, seed: int):
+        self.file = gzip.open(path, "wb")
+        self.record(b"S", struct.pack("<Q", seed))
+
+    def record(self, kind: bytes, data: bytes) -> None:
+        self.file.write(struct.pack("<cI", kind, len(data)) + data)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class BotProcess:
+    """Bot lancé dans un sous-processus et piloté par stdin/stdout, comme sur le site.
+
+    BOT_SEED donne au bot une graine pour ses tirages aléatoires ; avec transcript, l'arbitre enregistre
+    cette graine et tout ce qui passe par stdin et stdout.
+    """
+
+    def __init__(self, path: str, first_timeout: float = 1.0, timeout: float = 0.05, stderr=subprocess.DEVNULL,
+                 transcript: str = "", env: Optional[Dict[str, str]] = None, seed: int = 0):
+        self.path = os.path.abspath(path)
+        self.first_timeout = first_timeout
+        self.timeout = timeout
+        env = dict(os.environ, **(env or {}))
+        env["BOT_SEED"] = str(seed)
+        self.transcript = Transcript(transcript, seed) if transcript else None
+        self.proc = subprocess.Popen([sys.executable, "-u", self.path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=stderr, cwd=os.path.dirname(self.path), env=env)
+        self._buffer = b""
+        self._turns = 0
+
+    def send(self, text: str) -> bool:
+        # a bot that stops reading its input must not block the referee: give up after the turn timeout
+        data = text.encode()
+        if self.transcript:
+            self.transcript.record(b"I", data)
+        fd = self.proc.stdin.fileno()
+        os.set_blocking(fd, False)
+        deadline = time.perf_counter() + max(self.timeout, 0.1)
+        try:
+            while data:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                _, ready, _ = select.select([], [fd], [], remaining)
+                if ready:
+                    data = data[os.write(fd, data):]
+        except (BrokenPipeError, BlockingIOError):
+            return False
+        return True
+
+    def read_lines(self, count: int) -> Optional[List[str]]:
+        # raw reads under a deadline, so a silent bot cannot stall the referee
+        timeout = self.first_timeout if self._turns == 0 else self.timeout
+        self._turns += 1
+        deadline = time.perf_counter() + timeout
+        fd = self.proc.stdout.fileno()
+        while self._buffer.count(b"\n") < count:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        lines = self._buffer.split(b"\n")
+        self._buffer = b"\n".join(lines[count:])
+        if self.transcript:
+            self.transcript.record(b"O", b"\n".join(lines[:count]) + b"\n")
+        return [line.decode() for line in lines[:count]]
+
+    def close(self):
+        # closing stdin lets the bot see the end of the game and flush its own reports
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=1)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        if self.transcript:
+            self.transcript.close()
+
+
+def play_bots(paths: List[str], seed: int = 0, first_timeout: float = 1.0, timeout: float = 0.05,
+              stderr=subprocess.DEVNULL, transcript: str = "", envs: Optional[List[Dict[str, str]]] = None) -> Game:
+    """Joue une partie complète entre deux fichiers de bots.
+
+    Avec transcript, la partie de chaque bot est enregistrée dans transcript.p0 / transcript.p1 (voir replay.py).
+    Chaque bot reçoit sa graine BOT_SEED, tirée de seed.
+    envs donne des variables d'environnement propres à chaque bot (MYIA_PARAMS pour tune.py).
+    """
+    game = Game(seed)
+    bots = [BotProcess(path, first_timeout, timeout, stderr, transcript + ".p%d" % p if transcript else "",
+                       envs[p] if envs else None, 2*seed + p)
+            for p, path in enumerate(paths)]
+    try:
+        for p, bot in enumerate(bots):
+            if not bot.send(game.init_block()):
+                game.deactivate(p)
+        while not game.over:
+            for p, bot in enumerate(bots):
+                if not bot.send(game.turn_block(p)):
+                    game.deactivate(p)
+                    break
+                lines = bot.read_lines(2)
+                if lines is None or not game.set_actions(p, lines):
+                    game.deactivate(p)
+                    break
+            game.step()
+    finally:
+        for bot in bots:
+            bot.close()
+    return game
+
+
+def play_policies(policies: List[Callable[[Game, int], List[str]]], seed: int = 0) -> Game:
+    """Joue une partie entre deux fonctions Python, sans sous-processus ni texte échangé."""
+    game = Game(seed)
+    while not game.over:
+        for p, policy in enumerate(policies):
+            if not game.set_actions(p, policy(game, p)):
+                game.deactivate(p)
+        game.step()
+    return game
+
+
+def dive_policy(game: Game, player: int) -> List[str]:
+    """Politique de référence : plonge jusqu'au fond puis remonte, lumière tous les trois tours."""
+    actions = []
+    for d in game.drones:
+        if d.owner != player:
+            continue
+        light = 1 if game.turn % 3 == 0 and d.y > 2500 else 0
+        if d.scans and (d.y > 8000 or bin(d.scans).count("1") >= 4):
+            actions.append("MOVE %d %d %d" % (d.x, 0, light))
+        elif d.y <= SURFACE_Y or not d.scans:
+            actions.append("MOVE %d %d %d" % (d.x, MAP_SIZE - 1, light))
+        else:
+            actions.append("WAIT %d" % light)
+    return actions
+
+
+def bench(games: int) -> float:
+    """Nombre de parties complètes par minute avec dive_policy des deux côtés."""
+    start = time.perf_counter()
+    for seed in range(games):
+        play_policies([dive_policy, dive_policy], seed)
+    return games * 60 / (time.perf_counter() - start)
+
+
+def main(argv: List[str]):
+    import argparse
+    parser = argparse.ArgumentParser(description="Arbitre local de Seabed Security")
+    parser.add_argument("bots", nargs="*", help="deux fichiers de bots")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=0.05, help="temps de réponse par tour (s)")
+    parser.add_argument("--first-timeout", type=float, default=1.0, help="temps de réponse au premier tour (s)")
+    parser.add_argument("--stderr", action="store_true", help="affiche la sortie d'erreur des bots")
+    parser.add_argument("--transcript", default="", help="enregistre la partie de chaque bot dans TRANSCRIPT.p0/.p1")
+    parser.add_argument("--bench", type=int, default=0, help="mesure le débit du moteur sur N parties")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        print("%.0f games/minute" % bench(args.bench))
+        return
+    if len(args.bots) != 2:
+        parser.error("two bots are needed")
+    game = play_bots(args.bots, args.seed, args.first_timeout, args.timeout, None if args.stderr else subprocess.DEVNULL,
+                     args.transcript)
+    print("seed %d: %s %d - %d %s (turn %d)" % (args.seed, args.bots[0], game.scores[0], game.scores[1], args.bots[1], game.turn))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,119 @@
+"""
+    Rejoue une partie enregistrée (referee.py --transcript) sur n'importe quelle version d'un bot.
+
+    L'arbitre écrit, pour chaque bot, un flux gzip d'enregistrements (type sur 1 octet, longueur sur
+    4 octets, données) : S la graine BOT_SEED donnée au bot, I ce que l'arbitre a envoyé, O ce que le bot
+    a répondu. Le rejeu exécute le bot dans ce processus, entrée standard remplacée par
+    l'entrée enregistrée, sans arbitre ni sous-processus, puis compare ses réponses tour par tour.
+
+    Pour que MyIA.py rejoue à l'identique, enregistrer la partie avec MYIA_PLAN_DEPTH fixé : sinon la
+    profondeur atteinte par le planificateur dépend du temps de calcul disponible à chaque tour.
+
+    Utilisation :
+        python referee.py ../MyIA.py ../Devs/challenger2.py --transcript /tmp/game
+        python replay.py /tmp/game.p0 ../MyIA.py
+        python replay.py /tmp/game.p1 ../Devs/challenger2.py --profile
+"""
+
+import sys, os, io, zlib, struct, runpy, time
+from typing import List, Tuple
+
+RECORD = struct.Struct("<cI")
+
+
+def read_transcript(path: str) -> Tuple[int, List[Tuple[bytes, bytes]]]:
+    """Retourne (graine, [(entrée, sortie) par tour]) ; graine vaut -1 si le bot n'en a pas enregistré."""
+    with open(path, "rb") as f:
+        # a bot killed by the referee leaves an unfinished gzip stream: keep what was flushed
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(f.read())
+    seed = -1
+    turns = []
+    pending = b""
+    offset = 0
+    while offset + RECORD.size <= len(data):
+        kind, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        chunk = data[offset:offset + length]
+        offset += length
+        if kind == b"S":
+            seed = struct.unpack("<Q", chunk)[0]
+        elif kind == b"I":
+            pending += chunk
+        elif kind == b"O":
+            turns.append((pending, chunk))
+            pending = b""
+    if pending:
+        turns.append((pending, b""))  # the game ended while the bot was thinking
+    return seed, turns
+
+
+def run_bot(bot_path: str, stdin_data: bytes, seed: int = -1, stderr: bool = False) -> str:
+    """Exécute le bot dans ce processus sur stdin_data et retourne tout ce qu'il a écrit."""
+    bot_path = os.path.abspath(bot_path)
+    saved = sys.stdin, sys.stdout, sys.stderr, list(sys.path), os.getcwd(), dict(os.environ)
+    sys.stdin = io.TextIOWrapper(io.BytesIO(stdin_data))
+    sys.stdout = io.StringIO()
+    if not stderr:
+        sys.stderr = io.StringIO()
+    sys.path.insert(0, os.path.dirname(bot_path))
+    os.chdir(os.path.dirname(bot_path))
+    if seed >= 0:
+        os.environ["BOT_SEED"] = str(seed)
+    try:
+        runpy.run_path(bot_path, run_name="__main__")
+    except (EOFError, SystemExit):
+        pass  # how the bots notice the end of the input; anything else is a crash and keeps its traceback
+    finally:
+        output = sys.stdout.getvalue()
+        sys.stdin, sys.stdout, sys.stderr, sys.path[:], cwd, environ = saved
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(environ)
+    return output
+
+
+def replay(transcript_path: str, bot_path: str, stderr: bool = False) -> Tuple[int, List[Tuple[int, str, str]]]:
+    """Rejoue la partie et retourne (tours rejoués, [(tour, attendu, obtenu)] pour chaque différence)."""
+    seed, turns = read_transcript(transcript_path)
+    expected = [out.decode().splitlines() for _, out in turns]
+    lines = run_bot(bot_path, b"".join(inp for inp, _ in turns), seed, stderr).splitlines()
+
+    diffs = []
+    position = 0
+    for turn, wanted in enumerate(expected, 1):
+        got = lines[position:position + len(wanted)]
+        position += len(wanted)
+        for a, b in zip(wanted, got + [""] * (len(wanted) - len(got))):
+            if a != b:
+                diffs.append((turn, a, b))
+    return len(turns), diffs
+
+
+def main(argv: List[str]):
+    import argparse
+    parser = argparse.ArgumentParser(description="Rejoue une partie enregistrée sur un bot")
+    parser.add_argument("transcript")
+    parser.add_argument("bot")
+    parser.add_argument("--profile", action="store_true", help="profil cProfile du rejeu")
+    parser.add_argument("--stderr", action="store_true", help="affiche la sortie d'erreur du bot")
+    parser.add_argument("--show", type=int, default=10, help="différences affichées au plus")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.profile:
+        import cProfile, pstats
+        profiler = cProfile.Profile()
+        turns, diffs = profiler.runcall(replay, args.transcript, args.bot, args.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+    else:
+        turns, diffs = replay(args.transcript, args.bot, args.stderr)
+    elapsed = time.perf_counter() - start
+
+    for turn, wanted, got in diffs[:args.show]:
+        print("turn %3d: expected %r, got %r" % (turn, wanted, got))
+    print("%d turns replayed in %.0f ms, %d differing actions" % (turns, 1000 * elapsed, len(diffs)))
+    return 1 if diffs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
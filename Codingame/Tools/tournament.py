@@ -0,0 +1,139 @@
+"""
+    Tournoi local entre tous les bots de Codingame/.
+
+    Chaque paire de bots joue sur N graines, dans les deux sens (chacun joue une fois en premier joueur).
+    Les parties sont réparties sur un pool de processus, un par cœur : chaque processus joue le rôle de
+    l'arbitre du site (referee.play_bots) et lance les deux bots en sous-processus.
+
+    Les résultats sont donnés sous forme de taux de victoire avec intervalle de confiance (Wilson, 95 %)
+    et d'un classement Elo ajusté sur toutes les parties (modèle de Bradley-Terry, nul = demi-victoire).
+
+    Utilisation :
+        python tournament.py --seeds 50
+        python tournament.py --seeds 500 --bots MyIA.py Devs/challenger2.py --budget-ms 20 --csv results.csv
+"""
+
+import sys, os, math, time, itertools
+from multiprocessing import Pool
+from typing import List, Dict, Tuple
+
+from referee import play_bots
+
+CODINGAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BOTS = ["MyIA.py", "Devs/challenger1.py", "Devs/challenger2.py", "Devs/challenger3.py",
+                "Devs/step2.py", "Devs/vsBoss2.py"]
+
+
+def play_job(job: Tuple[str, str, int, float, float]) -> Tuple[str, str, int, int, int, int]:
+    """Joue une partie et retourne (bot0, bot1, graine, score0, score1, tours)."""
+    first, second, seed, first_timeout, timeout = job
+    paths = [os.path.join(CODINGAME_DIR, first), os.path.join(CODINGAME_DIR, second)]
+    game = play_bots(paths, seed, first_timeout, timeout)
+    return first, second, seed, game.scores[0], game.scores[1], game.turn
+
+
+def wilson(points: float, games: int, z: float = 1.96) -> Tuple[float, float]:
+    """Intervalle de confiance de Wilson sur un taux de victoire."""
+    if games == 0:
+        return 0.0, 1.0
+    p = points / games
+    centre = (p + z * z / (2 * games)) / (1 + z * z / games)
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def fit_elo(bots: List[str], results: List[Tuple[str, str, float]], iterations: int = 200) -> Dict[str, float]:
+    """Classement Elo par maximum de vraisemblance de Bradley-Terry (algorithme MM).
+
+    results contient (bot_a, bot_b, points de a) avec 1, 0.5 ou 0. Une partie nulle fictive contre
+    chaque autre bot sert de prior et évite les classements infinis quand un bot gagne tout.
+    """
+    index = {b: i for i, b in enumerate(bots)}
+    n = len(bots)
+    wins = [0.0] * n
+    games = [[0.0] * n for _ in range(n)]
+    for a, b, points in results:
+        i, j = index[a], index[b]
+        wins[i] += points
+        wins[j] += 1 - points
+        games[i][j] += 1
+        games[j][i] += 1
+    for i in range(n):
+        for j in range(n):
+            if i != j:
+                wins[i] += 0.5
+                games[i][j] += 1
+    strength = [1.0] * n
+    for _ in range(iterations):
+        for i in range(n):
+            denominator = sum(games[i][j] / (strength[i] + strength[j]) for j in range(n) if j != i)
+            if denominator > 0:
+                strength[i] = wins[i] / denominator
+        mean = math.exp(sum(math.log(s) for s in strength) / n)
+        strength = [s / mean for s in strength]
+    return {b: 1500 + 400 * math.log10(strength[index[b]]) for b in bots}
+
+
+def run(bots: List[str], seeds: int, processes: int, first_timeout: float, timeout: float, csv_path: str = ""):
+    jobs = [(a, b, seed, first_timeout, timeout)
+            for a, b in itertools.permutations(bots, 2) for seed in range(seeds)]
+    start = time.perf_counter()
+    games = []
+    with Pool(processes) as pool:
+        for done, result in enumerate(pool.imap_unordered(play_job, jobs, chunksize=4), 1):
+            games.append(result)
+            if done % 100 == 0 or done == len(jobs):
+                print("%d/%d games, %.1f games/s" % (done, len(jobs), done / (time.perf_counter() - start)),
+                      file=sys.stderr, flush=True)
+
+    if csv_path:
+        with open(csv_path, "w") as f:
+            f.write("bot0,bot1,seed,score0,score1,turns\n")
+            for g in sorted(games):
+                f.write("%s,%s,%d,%d,%d,%d\n" % g)
+
+    # one result per game, seen from the first bot
+    results = []
+    for first, second, _, score0, score1, _ in games:
+        results.append((first, second, 1.0 if score0 > score1 else 0.0 if score0 < score1 else 0.5))
+    report(bots, results)
+
+
+def report(bots: List[str], results: List[Tuple[str, str, float]]):
+    points = {b: 0.0 for b in bots}
+    played = {b: 0 for b in bots}
+    for a, b, p in results:
+        points[a] += p
+        points[b] += 1 - p
+        played[a] += 1
+        played[b] += 1
+    elo = fit_elo(bots, results)
+    width = max(len(b) for b in bots)
+    print("%-*s %7s %6s %8s %17s" % (width, "bot", "elo", "games", "win", "95% ci"))
+    for b in sorted(bots, key=lambda b: -elo[b]):
+        low, high = wilson(points[b], played[b])
+        rate = points[b] / played[b] if played[b] else 0.0
+        print("%-*s %7.0f %6d %7.1f%% %7.1f%% - %5.1f%%" % (width, b, elo[b], played[b], 100 * rate, 100 * low, 100 * high))
+
+
+def main(argv: List[str]):
+    import argparse
+    parser = argparse.ArgumentParser(description="Tournoi multi-graines entre les bots de Codingame/")
+    parser.add_argument("--bots", nargs="+", default=DEFAULT_BOTS, help="chemins relatifs à Codingame/")
+    parser.add_argument("--seeds", type=int, default=10, help="graines par paire et par côté")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--timeout", type=float, default=0.05, help="temps de réponse par tour (s)")
+    parser.add_argument("--first-timeout", type=float, default=1.0, help="temps de réponse au premier tour (s)")
+    parser.add_argument("--budget-ms", type=int, default=0, help="budget de réflexion par tour transmis à MyIA.py")
+    parser.add_argument("--csv", default="", help="écrit le détail des parties dans ce fichier")
+    args = parser.parse_args(argv)
+
+    if args.budget_ms:
+        # inherited by every bot process started by the referees
+        os.environ["MYIA_BUDGET_MS"] = str(args.budget_ms)
+        os.environ["MYIA_FIRST_BUDGET_MS"] = str(args.budget_ms)
+    run(args.bots, args.seeds, args.processes, args.first_timeout, args.timeout, args.csv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
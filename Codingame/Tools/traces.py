@@ -0,0 +1,49 @@
+"""
+    Relit un fichier MYIA_TRACE écrit par MyIA.py (Diagnostics.trace), hors du bot soumis.
+
+    Chaque enregistrement est un en-tête (tour sur 2 octets, type sur 1 octet, nombre de valeurs sur
+    1 octet) suivi des valeurs en float32 :
+        plan     drone, x, y, cible x, cible y, lumière, batterie, urgence
+        monster  id, x, y, vx, vy
+        score    notre score, score adverse, nos scans sauvés, scans sauvés adverses
+
+    Utilisation :
+        MYIA_TRACE=/tmp/myia.trace python referee.py ../MyIA.py ../Devs/challenger2.py
+        python traces.py /tmp/myia.trace --kind plan
+"""
+
+import sys, struct
+from typing import List, Tuple, Iterator
+
+# the same record header and kinds as MyIA.py
+TRACE_HEADER = struct.Struct("<HBB")  # turn, kind, number of float32 values
+KINDS = {1: "plan", 2: "monster", 3: "score"}
+
+
+def read_trace(path: str) -> Iterator[Tuple[int, int, Tuple[float, ...]]]:
+    """Enregistrements (tour, type, valeurs) du fichier, dans l'ordre d'écriture."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        turn, kind, count = TRACE_HEADER.unpack_from(data, offset)
+        offset += TRACE_HEADER.size
+        values = struct.unpack_from(f"<{count}f", data, offset)
+        offset += 4*count
+        yield turn, kind, values
+
+
+def main(argv: List[str]):
+    import argparse
+    parser = argparse.ArgumentParser(description="Relit un fichier MYIA_TRACE")
+    parser.add_argument("trace", help="fichier écrit avec MYIA_TRACE=<fichier>")
+    parser.add_argument("--kind", choices=sorted(KINDS.values()), help="ne garder qu'un type d'enregistrement")
+    args = parser.parse_args(argv)
+    for turn, kind, values in read_trace(args.trace):
+        name = KINDS.get(kind, str(kind))
+        if args.kind is None or name == args.kind:
+            print("%3d %-7s %s" % (turn, name, " ".join("%g" % v for v in values)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,258 @@
+"""
+    Réglage des constantes de MyIA.py par CMA-ES.
+
+    Le bloc PARAMS de MyIA.py forme le vecteur de paramètres ; SPACE donne l'intervalle exploré pour chacun.
+    Chaque candidat joue contre des adversaires fixes (par défaut challenger2 et MyIA avec ses valeurs
+    actuelles) sur les mêmes graines, des deux côtés, avec l'arbitre local sur un pool de processus. Les
+    valeurs sont passées au seul bot candidat par la variable MYIA_PARAMS.
+
+    Le score d'un candidat est son taux de victoire (nul = demi-victoire), départagé par l'écart de points.
+    Chaque partie est mise en cache par (empreinte des paramètres, empreinte de la partie, adversaire, graine,
+    côté) dans un fichier JSON lines : un candidat déjà joué ne rejoue pas, et un réglage interrompu reprend
+    où il s'était arrêté. L'empreinte de la partie couvre les sources de MyIA.py et de l'adversaire, les
+    délais (--timeout, --first-timeout) et le budget (--budget-ms) : modifier l'un d'eux rejoue tout.
+
+    À la fin, le meilleur candidat est écrit sous la forme d'un bloc PARAMS prêt à coller dans MyIA.py.
+
+    Utilisation :
+        python tune.py --generations 20 --seeds 8
+        python tune.py --opponents Devs/challenger2.py --budget-ms 20 --cache /tmp/tune.jsonl --out /tmp/params.py
+"""
+
+import sys, os, re, ast, json, math, time, hashlib
+from multiprocessing import Pool
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from referee import play_bots
+
+CODINGAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tune_cache.jsonl")  # ignored by git
+BOT = "MyIA.py"
+DEFAULT_OPPONENTS = ["Devs/challenger2.py", "MyIA.py"]
+
+# interval searched for each entry of PARAMS, integer defaults stay integers
+SPACE = {
+    "drone_speed": (300, 600),
+    "shallow_speed": (300, 600),
+    "battery_value": (0.0, 0.3),
+    "scan_discount": (0.4, 1.0),
+    "wake_cost": (0.0, 1.0),
+    "miss_distance": (500, 1600),
+    "monster_patrol": (200, 400),
+    "monster_chase": (450, 650),
+    "route_fish": (1, 7),
+}
+
+
+def read_params(path: str) -> Tuple[Dict[str, float], List[str]]:
+    """Valeurs du bloc PARAMS du bot et lignes du bloc, pour le réécrire tel quel avec d'autres valeurs."""
+    lines = open(path).read().splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith("PARAMS = {"))
+    end = next(i for i in range(start, len(lines)) if lines[i].startswith("}"))
+    block = lines[start:end+1]
+    return ast.literal_eval("\n".join(re.sub(r"#.*", "", line) for line in block)[len("PARAMS = "):]), block
+
+
+def params_block(block: List[str], params: Dict[str, float]) -> str:
+    out = []
+    for line in block:
+        match = re.match(r'(\s*"(\w+)": )([^,]+)(,.*)', line)
+        if match and match.group(2) in params:
+            line = match.group(1) + repr(params[match.group(2)]) + match.group(4)
+        out.append(line)
+    return "\n".join(out) + "\n"
+
+
+def key(params: Dict[str, float]) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class Cache:
+    """Résultats des parties déjà jouées, par clé game_key."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.games: Dict[str, Tuple[int, int]] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.games[entry["key"]] = (entry["mine"], entry["theirs"])
+
+    def add(self, game_key: str, mine: int, theirs: int) -> None:
+        self.games[game_key] = (mine, theirs)
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": game_key, "mine": mine, "theirs": theirs}) + "\n")
+
+
+def setup_key(opponent: str, first_timeout: float, timeout: float) -> str:
+    """Empreinte de ce qui décide d'une partie en dehors des paramètres : sources des deux bots, délais et budget."""
+    h = hashlib.sha1()
+    for path in (BOT, opponent):
+        with open(os.path.join(CODINGAME_DIR, path), "rb") as f:
+            h.update(f.read())
+    budget = [os.environ.get(name, "") for name in ("MYIA_BUDGET_MS", "MYIA_FIRST_BUDGET_MS")]
+    h.update(json.dumps([first_timeout, timeout] + budget).encode())
+    return h.hexdigest()[:12]
+
+
+def game_key(params: Dict[str, float], setup: str, opponent: str, seed: int, side: int) -> str:
+    return "%s:%s:%s:%d:%d" % (key(params), setup, opponent, seed, side)
+
+
+def play_job(job: Tuple[str, Dict[str, float], str, int, int, float, float]) -> Tuple[str, int, int]:
+    """Joue une partie du candidat et retourne (clé, score du candidat, score de l'adversaire)."""
+    k, params, opponent, seed, side, first_timeout, timeout = job
+    paths = [os.path.join(CODINGAME_DIR, BOT), os.path.join(CODINGAME_DIR, opponent)]
+    envs = [{"MYIA_PARAMS": json.dumps(params)}, {}]
+    if side:
+        paths.reverse()
+        envs.reverse()
+    game = play_bots(paths, seed, first_timeout, timeout, envs=envs)
+    return k, game.scores[side], game.scores[1-side]
+
+
+def fitness(games: List[Tuple[int, int]]) -> float:
+    points = sum(1.0 if a > b else 0.5 if a == b else 0.0 for a, b in games)
+    margin = sum(a - b for a, b in games)
+    return (points + 0.001*margin)/max(len(games), 1)
+
+
+def decode(z: np.ndarray) -> Dict[str, float]:
+    """Paramètres du bot pour un point de [0, 1]^n."""
+    z = np.clip(z, 0, 1)
+    return {name: int(round(low + float(v)*(high - low))) if isinstance(low, int) else round(low + float(v)*(high - low), 3)
+            for v, (name, (low, high)) in zip(z, SPACE.items())}
+
+
+def encode(params: Dict[str, float]) -> np.ndarray:
+    return np.array([(params[name] - low)/(high - low) for name, (low, high) in SPACE.items()])
+
+
+class CMAES:
+    """CMA-ES (mu/mu_w, lambda) sur [0, 1]^n, qui maximise."""
+
+    def __init__(self, mean: np.ndarray, sigma: float, seed: int = 0):
+        n = len(mean)
+        self.n = n
+        self.mean = mean.astype(float)
+        self.sigma = sigma
+        self.rng = np.random.default_rng(seed)
+        self.lam = 4 + int(3*math.log(n))
+        self.mu = self.lam//2
+        weights = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu+1))
+        self.weights = weights/weights.sum()
+        self.mueff = 1/(self.weights**2).sum()
+        self.cc = (4 + self.mueff/n)/(n + 4 + 2*self.mueff/n)
+        self.cs = (self.mueff + 2)/(n + self.mueff + 5)
+        self.c1 = 2/((n + 1.3)**2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2*(self.mueff - 2 + 1/self.mueff)/((n + 2)**2 + self.mueff))
+        self.damps = 1 + 2*max(0, math.sqrt((self.mueff - 1)/(n + 1)) - 1) + self.cs
+        self.chi = math.sqrt(n)*(1 - 1/(4*n) + 1/(21*n*n))
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.C = np.eye(n)
+        self.generation = 0
+
+    def ask(self) -> np.ndarray:
+        values, vectors = np.linalg.eigh(self.C)
+        self.B, self.D = vectors, np.sqrt(np.maximum(values, 1e-20))
+        z = self.rng.standard_normal((self.lam, self.n))
+        return self.mean + self.sigma*(z*self.D) @ self.B.T
+
+    def tell(self, points: np.ndarray, scores: np.ndarray) -> None:
+        self.generation += 1
+        order = np.argsort(-scores)[:self.mu]
+        y = (points[order] - self.mean)/self.sigma
+        step = self.weights @ y
+        self.mean = self.mean + self.sigma*step
+        inv_sqrt = self.B @ np.diag(1/self.D) @ self.B.T
+        self.ps = (1 - self.cs)*self.ps + math.sqrt(self.cs*(2 - self.cs)*self.mueff)*inv_sqrt @ step
+        norm = np.linalg.norm(self.ps)/math.sqrt(1 - (1 - self.cs)**(2*self.generation))
+        hsig = norm/self.chi < 1.4 + 2/(self.n + 1)
+        self.pc = (1 - self.cc)*self.pc + hsig*math.sqrt(self.cc*(2 - self.cc)*self.mueff)*step
+        rank_mu = (self.weights[:, None]*y).T @ y
+        self.C = ((1 - self.c1 - self.cmu)*self.C
+                  + self.c1*(np.outer(self.pc, self.pc) + (1 - hsig)*self.cc*(2 - self.cc)*self.C)
+                  + self.cmu*rank_mu)
+        self.sigma *= math.exp(self.cs/self.damps*(np.linalg.norm(self.ps)/self.chi - 1))
+
+
+def evaluate(candidates: List[Dict[str, float]], opponents: List[str], seeds: int, pool: Pool, cache: Cache,
+             first_timeout: float, timeout: float) -> List[float]:
+    # every game of the generation that is not in the cache, on the whole pool at once
+    setups = {opponent: setup_key(opponent, first_timeout, timeout) for opponent in opponents}
+    jobs = {}
+    for params in candidates:
+        for opponent in opponents:
+            for seed in range(seeds):
+                for side in (0, 1):
+                    k = game_key(params, setups[opponent], opponent, seed, side)
+                    if k not in cache.games:
+                        jobs[k] = (k, params, opponent, seed, side, first_timeout, timeout)
+    for k, mine, theirs in pool.imap_unordered(play_job, list(jobs.values())):
+        cache.add(k, mine, theirs)
+    return [fitness([cache.games[game_key(params, setups[opponent], opponent, seed, side)]
+                     for opponent in opponents for seed in range(seeds) for side in (0, 1)])
+            for params in candidates]
+
+
+def run(generations: int, seeds: int, opponents: List[str], processes: int, sigma: float, cache_path: str,
+        out: str, first_timeout: float, timeout: float, rng_seed: int) -> Dict[str, float]:
+    defaults, block = read_params(os.path.join(CODINGAME_DIR, BOT))
+    cache = Cache(cache_path)
+    es = CMAES(encode(defaults), sigma, rng_seed)
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        best, best_score = defaults, evaluate([defaults], opponents, seeds, pool, cache, first_timeout, timeout)[0]
+        print("defaults: %.3f %s" % (best_score, defaults), file=sys.stderr, flush=True)
+        for generation in range(1, generations+1):
+            points = es.ask()
+            candidates = [decode(z) for z in points]
+            scores = evaluate(candidates, opponents, seeds, pool, cache, first_timeout, timeout)
+            es.tell(points, np.array(scores))
+            top = int(np.argmax(scores))
+            if scores[top] > best_score:
+                best, best_score = candidates[top], scores[top]
+            print("generation %d: best %.3f, this generation %.3f, sigma %.3f, %d games cached, %.0f s" % (
+                generation, best_score, scores[top], es.sigma, len(cache.games), time.perf_counter() - start),
+                file=sys.stderr, flush=True)
+
+    text = params_block(block, best)
+    print("# fitness %.3f over %d seeds against %s" % (best_score, seeds, ", ".join(opponents)))
+    print(text, end="")
+    if out:
+        with open(out, "w") as f:
+            f.write(text)
+    return best
+
+
+def main(argv: List[str]):
+    import argparse
+    parser = argparse.ArgumentParser(description="Réglage CMA-ES des constantes de MyIA.py")
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--seeds", type=int, default=4, help="graines par adversaire et par côté")
+    parser.add_argument("--opponents", nargs="+", default=DEFAULT_OPPONENTS, help="chemins relatifs à Codingame/")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--sigma", type=float, default=0.2, help="pas initial, en fraction de chaque intervalle")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="fichier des parties déjà jouées (par défaut à côté de tune.py)")
+    parser.add_argument("--out", default="", help="écrit aussi le bloc PARAMS dans ce fichier")
+    parser.add_argument("--timeout", type=float, default=0.05, help="temps de réponse par tour (s)")
+    parser.add_argument("--first-timeout", type=float, default=1.0, help="temps de réponse au premier tour (s)")
+    parser.add_argument("--budget-ms", type=int, default=0, help="budget de réflexion par tour transmis à MyIA.py")
+    parser.add_argument("--rng-seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.budget_ms:
+        # inherited by every bot process started by the referees
+        os.environ["MYIA_BUDGET_MS"] = str(args.budget_ms)
+        os.environ["MYIA_FIRST_BUDGET_MS"] = str(args.budget_ms)
+    run(args.generations, args.seeds, args.opponents, args.processes, args.sigma, args.cache, args.out,
+        args.first_timeout, args.timeout, args.rng_seed)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])